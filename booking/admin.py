@@ -1,12 +1,161 @@
-from django.contrib import admin
+from datetime import date
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import PAGE_VAR
 from django.contrib.auth import get_user_model
-from .models import Booking, OwnerProfile, Collaborator, PricingRule, PricingConfig
+from django.core.paginator import Paginator
+from django.db import IntegrityError
+from django.db.models import Q
+from django.utils.functional import cached_property
+from .models import (
+    Booking, BookingHold, OwnerProfile, Collaborator, PricingRule, PricingConfig, ProcessedStripeEvent, Property, RateRule,
+)
+from .pricing import reprice_bookings
+from .utils import delete_past_pricing_rules, mark_bookings_paid
 
 User = get_user_model()
 
+ESTIMATED_COUNT_CAP = 10000  # Rows a changelist counts past the page being viewed
+
 admin.site.register(User)
-admin.site.register(Booking)
 admin.site.register(OwnerProfile)
 admin.site.register(Collaborator)
-admin.site.register(PricingRule)
-admin.site.register(PricingConfig)
\ No newline at end of file
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    The changelist only needs its count to draw the page links, so rows
+    are counted up to count_up_to instead of running a COUNT(*) over the
+    table. Past that, capped is set and the count shows as "N+" (see
+    templates/admin/booking/pagination.html). The links never reach past
+    the last real row, however many ids deletes have left unused.
+    """
+    def __init__(self, *args, count_up_to=ESTIMATED_COUNT_CAP, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_up_to = count_up_to
+        self.capped = False
+
+    @cached_property
+    def count(self):
+        counted = self.object_list.order_by()[:self.count_up_to + 1].count()
+        self.capped = counted > self.count_up_to
+        return min(counted, self.count_up_to)
+
+
+class IndexedBooleanListFilter(admin.BooleanFieldListFilter):
+    """
+    paid=True and paid=False compile to WHERE "paid" and WHERE NOT "paid",
+    which SQLite can only answer by scanning; paid IN (...) is looked up
+    in an index that starts with the field like any equality.
+    """
+    def queryset(self, request, queryset):
+        if self.lookup_val in ('1', '0') and not self.lookup_val2:
+            return queryset.filter(**{f'{self.field_path}__in': [self.lookup_val == '1']})
+        return super().queryset(request, queryset)
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist settings for tables that grow without bound."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_select_related = ('property',)
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        # Count ESTIMATED_COUNT_CAP rows beyond the page asked for, so the
+        # page links always reach further and every row stays reachable
+        try:
+            page_num = max(int(request.GET.get(PAGE_VAR, 1)), 1)
+        except ValueError:
+            page_num = 1
+        return self.paginator(
+            queryset, per_page, orphans, allow_empty_first_page,
+            count_up_to=page_num * per_page + ESTIMATED_COUNT_CAP,
+        )
+
+
+@admin.register(Booking)
+class BookingAdmin(LargeTableAdmin):
+    list_display = ('name', 'email', 'property', 'check_in', 'check_out', 'paid', 'total_price')
+    # property is served by the property-first indexes, paid and the
+    # check_in drill-down by booking_paid_checkin_idx and booking_checkin_idx
+    list_filter = ('property', ('paid', IndexedBooleanListFilter))
+    date_hierarchy = 'check_in'
+    search_fields = ('email',)
+    search_help_text = "Exact guest e-mail"
+    actions = ['mark_paid', 'reprice']
+
+    def get_search_results(self, request, queryset, search_term):
+        # An exact match on booking_email_idx; the default icontains would
+        # scan the whole table
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(email=search_term.strip()), False
+
+    @admin.action(description="Mark selected bookings as paid")
+    def mark_paid(self, request, queryset):
+        try:
+            marked = mark_bookings_paid(queryset)
+        except IntegrityError:
+            self.message_user(request, "Some of these nights are already booked; nothing was changed.", messages.ERROR)
+            return
+        self.message_user(request, f"Marked {marked} booking(s) as paid.")
+
+    @admin.action(description="Reprice selected upcoming unpaid bookings from the current rates")
+    def reprice(self, request, queryset):
+        # Like `manage.py reprice_bookings`: paid and past bookings keep
+        # what Stripe charged
+        upcoming_unpaid = Q(paid=False, check_in__gte=date.today())
+        changed = reprice_bookings(
+            queryset.filter(upcoming_unpaid).only('id', 'property', 'check_in', 'check_out', 'total_price')
+        )
+        skipped = queryset.exclude(upcoming_unpaid).count()
+        message = f"Repriced {changed} booking(s)."
+        if skipped:
+            message += f" Skipped {skipped} paid or past booking(s)."
+        self.message_user(request, message)
+
+
+@admin.register(PricingRule)
+class PricingRuleAdmin(LargeTableAdmin):
+    list_display = ('date', 'property', 'rate', 'created_at')
+    # Served by the (property, date) unique index
+    list_filter = ('property',)
+    date_hierarchy = 'date'
+    actions = ['delete_past_rules']
+
+    @admin.action(description="Delete selected rules dated before today")
+    def delete_past_rules(self, request, queryset):
+        deleted = delete_past_pricing_rules(queryset)
+        self.message_user(request, f"Deleted {deleted} past rule(s).")
+
+
+@admin.register(PricingConfig)
+class PricingConfigAdmin(admin.ModelAdmin):
+    list_display = ('property', 'base_rate')
+    list_select_related = ('property',)
+
+
+@admin.register(Property)
+class PropertyAdmin(admin.ModelAdmin):
+    list_display = ('name', 'slug', 'owner', 'created_at')
+    prepopulated_fields = {'slug': ('name',)}
+    search_fields = ('name', 'slug')
+
+
+@admin.register(RateRule)
+class RateRuleAdmin(admin.ModelAdmin):
+    list_display = ('name', 'property', 'kind', 'start_date', 'end_date', 'weekdays', 'rate', 'priority')
+    list_filter = ('property', 'kind')
+
+
+@admin.register(BookingHold)
+class BookingHoldAdmin(admin.ModelAdmin):
+    list_display = ('property', 'check_in', 'check_out', 'expires_at', 'created_at')
+    list_filter = ('property',)
+
+
+@admin.register(ProcessedStripeEvent)
+class ProcessedStripeEventAdmin(LargeTableAdmin):
+    list_display = ('event_id', 'event_type', 'outcome', 'duration_ms', 'processed_at')
+    list_filter = ('event_type', 'outcome')
+    list_select_related = ()
+    search_fields = ('event_id',)
@@ -0,0 +1,61 @@
+"""
+Shared helpers for the benchmark management commands.
+"""
+from contextlib import contextmanager
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test.utils import setup_test_environment, teardown_test_environment
+import math
+import os
+import tempfile
+
+
+@contextmanager
+def throwaway_database():
+    """
+    Runs the block against a fresh test database (as `manage.py test`
+    would create it) and drops it afterwards. The real database is never
+    touched.
+    """
+    setup_test_environment()
+    test_db = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    cache.clear()
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(test_db, verbosity=0)
+        teardown_test_environment()
+
+
+@contextmanager
+def sqlite_file_database(**overrides):
+    """
+    Runs the block against a migrated SQLite file in a temporary directory,
+    with `overrides` (OPTIONS, CONN_MAX_AGE, ...) applied to the default
+    connection settings. Unlike throwaway_database, every thread opens its
+    own connection to the same file, as separate workers would.
+    """
+    settings_dict = connections.settings['default']
+    saved = dict(settings_dict)
+    connections.close_all()
+    setup_test_environment()
+    with tempfile.TemporaryDirectory() as directory:
+        settings_dict.update({'OPTIONS': {}, 'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False})
+        settings_dict.update(overrides, NAME=os.path.join(directory, 'bench.sqlite3'))
+        cache.clear()
+        try:
+            call_command('migrate', verbosity=0)
+            yield
+        finally:
+            connections.close_all()
+            settings_dict.clear()
+            settings_dict.update(saved)
+            teardown_test_environment()
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(samples)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
@@ -0,0 +1,108 @@
+"""
+Stripe Checkout session creation.
+
+The Stripe SDK is blocking, so the async booking path runs it on a
+dedicated pool of STRIPE_MAX_CONCURRENCY threads, and a per-process
+semaphore turns guests away once that many calls are in flight instead of
+queueing them. Each call is bounded by the HTTP client's connect/read
+timeouts, without retries. It is never abandoned while still running: a
+call cut off by an outer deadline could still create a session after
+book_view released the hold. When Stripe is slow or the cap is reached,
+callers get CheckoutUnavailable and can show a retry page instead of
+tying up workers.
+"""
+from .instrumentation import track
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+import asyncio
+import contextvars
+import logging
+import threading
+import stripe
+
+
+logger = logging.getLogger(__name__)
+
+stripe.api_key = settings.STRIPE_SECRET_KEY
+stripe.api_base = settings.STRIPE_API_BASE
+stripe.default_http_client = stripe.RequestsClient(
+    timeout=(settings.STRIPE_CONNECT_TIMEOUT, settings.STRIPE_READ_TIMEOUT)
+)
+# A retried call would take several times the timeouts; the guest can
+# resubmit from the retry page instead
+stripe.max_network_retries = 0
+
+# Not the loop's default executor, which is small and shared with
+# everything else running off the loop
+_executor = ThreadPoolExecutor(max_workers=settings.STRIPE_MAX_CONCURRENCY, thread_name_prefix='stripe')
+
+# threading (not asyncio) semaphore: it must work across event loops.
+_in_flight = threading.BoundedSemaphore(settings.STRIPE_MAX_CONCURRENCY)
+
+
+class CheckoutUnavailable(Exception):
+    """Stripe could not be reached in time, or too many calls are in flight."""
+
+
+def create_checkout_session(name, email, check_in, check_out, total_amount, property_id=None, hold_id=None,
+                            expires_at=None):
+    """
+    Creates the Stripe Checkout session for a stay. total_amount is in
+    cents. With a hold (see booking.holds), the session carries its id and
+    expires along with it. Blocks for the duration of the Stripe call.
+    """
+    extra = {'expires_at': int(expires_at.timestamp())} if expires_at else {}
+    with track('stripe'):
+        return stripe.checkout.Session.create(
+            payment_method_types=['card'],
+            line_items=[{
+                'price_data': {
+                    'currency': 'eur',
+                    'product_data': {
+                        'name': f'Booking for {name}',
+                    },
+                    'unit_amount': total_amount,
+                },
+                'quantity': 1,
+            }],
+            mode='payment',
+            success_url=settings.DOMAIN + '/success/',
+            cancel_url=settings.DOMAIN + '/cancel/',
+            metadata={
+                'property_id': property_id or '',
+                'name': name,
+                'email': email,
+                'check_in': check_in.isoformat(),
+                'check_out': check_out.isoformat(),
+                'total_price': total_amount / 100,
+                'hold_id': hold_id or '',
+            },
+            **extra
+        )
+
+
+async def acreate_checkout_session(**kwargs):
+    """
+    Async wrapper around create_checkout_session. Raises
+    CheckoutUnavailable on timeout, connection errors or when
+    STRIPE_MAX_CONCURRENCY calls are already running.
+    """
+    if not _in_flight.acquire(blocking=False):
+        logger.warning("Stripe checkout rejected: %s calls already in flight", settings.STRIPE_MAX_CONCURRENCY)
+        raise CheckoutUnavailable()
+
+    def call():
+        try:
+            return create_checkout_session(**kwargs)
+        finally:
+            # Released by the thread, so a request cancelled while waiting
+            # still counts against the limit until the call really finishes
+            _in_flight.release()
+
+    # Like asyncio.to_thread, carry the context over so the call is timed
+    # on the request (see instrumentation.track)
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, contextvars.copy_context().run, call)
+    except stripe.error.APIConnectionError as e:  # Also raised on connect/read timeouts
+        logger.warning(f"Stripe checkout creation failed: {e!r}")
+        raise CheckoutUnavailable() from e
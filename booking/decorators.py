@@ -1,19 +1,50 @@
+from asgiref.sync import iscoroutinefunction, sync_to_async
 from functools import wraps
+from django.http import Http404
 from django.shortcuts import redirect
-from .models import Collaborator
+from .models import Property
+from .utils import get_property, get_user_role
+
+def with_property(view_func):
+    """
+    Resolves the `property_slug` URL argument (missing on the unscoped
+    URLs, which serve the default property) into request.property.
+    """
+    def resolve(request, property_slug):
+        try:
+            request.property = get_property(property_slug)
+        except Property.DoesNotExist:
+            raise Http404('No such property.')
+        request.property_slug = property_slug
+
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, property_slug=None, **kwargs):
+            await sync_to_async(resolve)(request, property_slug)
+            return await view_func(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, property_slug=None, **kwargs):
+        resolve(request, property_slug)
+        return view_func(request, *args, **kwargs)
+    return wrapper
 
 def owner_required(view_func):
+    """
+    Lets owners and collaborators of the request's property through, with
+    their cached Role on request.role. Costs no query once the role is
+    cached, beyond loading the user.
+    """
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
         user = request.user
         if not user.is_authenticated:
             return redirect('login')
 
-        is_owner = hasattr(user, 'owner_profile')  # Use lower-case relation
-        is_collaborator = Collaborator.objects.filter(user=user).exists()
-
-        if is_owner or is_collaborator:
+        request.role = get_user_role(user)
+        if request.role.can_manage(getattr(request, 'property', None)):
             return view_func(request, *args, **kwargs)
 
         return redirect('/')  # or a permission-denied page
-    return wrapper
\ No newline at end of file
+    return wrapper
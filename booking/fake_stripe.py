@@ -0,0 +1,60 @@
+"""
+Minimal stand-in for the Stripe API, for local load tests.
+
+Answers POST /v1/checkout/sessions with a checkout.session object after an
+injected delay, so the booking path can be exercised against a slow
+upstream without touching the real API. Point STRIPE_API_BASE at it.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+import uuid
+
+
+class FakeStripeHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(self.server.latency)
+
+        if self.path.rstrip('/') != '/v1/checkout/sessions':
+            self._send(404, {'error': {'type': 'invalid_request_error', 'message': 'Unknown path'}})
+            return
+
+        session_id = f"cs_test_{uuid.uuid4().hex}"
+        self._send(200, {
+            'id': session_id,
+            'object': 'checkout.session',
+            'url': f"http://{self.server.server_address[0]}:{self.server.server_address[1]}/pay/{session_id}",
+        })
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+
+
+class FakeStripeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0):
+        super().__init__((host, port), FakeStripeHandler)
+        self.latency = latency
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start_in_background(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
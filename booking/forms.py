@@ -1,6 +1,6 @@
 from .models import Booking, AvailabilityConfig
 from .utils import get_max_bookable_date
-from datetime import timedelta
+from datetime import date, timedelta
 from django import forms
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
@@ -17,22 +17,51 @@ class BookingForm(forms.ModelForm):
             'check_out': forms.DateInput(attrs={'type': 'date'}),
         }
 
+    def __init__(self, *args, property_id=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.property_id = property_id  # None checks against the default property
+
+    def clean(self):
+        cleaned_data = super().clean()
+        validate_stay_dates(cleaned_data.get('check_in'), cleaned_data.get('check_out'), self.property_id)
+
+
+def validate_stay_dates(check_in, check_out, property_id=None, data_version=None):
+    """
+    Checks a stay against the property's booking window. Either date may
+    be None when its field failed validation.
+    """
+    latest_allowed = get_max_bookable_date(property_id, data_version)
+
+    if check_in and check_out and check_out <= check_in:
+        raise forms.ValidationError("Check-out date must be after check-in date.")
+    
+    # Only validate if check_in is provided and valid
+    if check_in and check_in > latest_allowed:
+        raise ValidationError("Check-in is too far in the future.")
+
+    # Only validate if check_out is provided and valid
+    if check_out and check_out > latest_allowed + timedelta(days=1):
+        raise ValidationError("Check-out is too far in the future.")
+
+
+class QuoteForm(forms.Form):
+    """The dates of a /quote/ request, checked like a booking's."""
+    check_in = forms.DateField()
+    check_out = forms.DateField()
+
+    def __init__(self, *args, property_id=None, data_version=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.property_id = property_id
+        self.data_version = data_version
+
     def clean(self):
         cleaned_data = super().clean()
         check_in = cleaned_data.get('check_in')
-        check_out = cleaned_data.get('check_out')
-        latest_allowed = get_max_bookable_date()
-
-        if check_in and check_out and check_out <= check_in:
-            raise forms.ValidationError("Check-out date must be after check-in date.")
-        
-        # Only validate if check_in is provided and valid
-        if check_in and check_in > latest_allowed:
-            raise ValidationError("Check-in is too far in the future.")
-
-        # Only validate if check_out is provided and valid
-        if check_out and check_out > latest_allowed + timedelta(days=1):
-            raise ValidationError("Check-out is too far in the future.")
+        if check_in and check_in < date.today():
+            raise ValidationError("Check-in date cannot be in the past.")
+        validate_stay_dates(check_in, cleaned_data.get('check_out'), self.property_id, self.data_version)
+        return cleaned_data
 
 
 class RegisterForm(forms.ModelForm):
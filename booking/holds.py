@@ -0,0 +1,49 @@
+"""
+Date holds for checkouts in progress.
+
+book_view places a hold on the stay before creating the Stripe Checkout
+session, so two guests can no longer pay for the same nights: the second
+one is told the dates are taken before reaching Stripe, instead of
+getting a 409 from the webhook after paying. The session expires together
+with the hold (settings.BOOKING_HOLD_MINUTES). The webhook releases the
+hold in the transaction that creates the booking, or when Stripe reports
+the session expired; `manage.py sweep_holds` deletes whatever lapsed.
+"""
+from .models import BookingHold, Property
+from .utils import are_dates_available
+from datetime import date, timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+
+def place_hold(property_id, check_in: date, check_out: date):
+    """
+    Holds [check_in, check_out) if no paid booking or other active hold
+    overlaps it. Returns the BookingHold, or None when the dates are taken.
+    """
+    with transaction.atomic():
+        # Row lock on the property serializes placements where the
+        # database supports it; on SQLite the write lock does, with
+        # BEGIN IMMEDIATE (see SQLITE_PRODUCTION_PROFILE)
+        list(Property.objects.select_for_update().filter(pk=property_id).values_list('pk'))
+        if not are_dates_available(check_in, check_out, property_id):
+            return None
+        return BookingHold.objects.create(
+            property_id=property_id,
+            check_in=check_in,
+            check_out=check_out,
+            expires_at=timezone.now() + timedelta(minutes=settings.BOOKING_HOLD_MINUTES),
+        )
+
+
+def release_hold(hold_id):
+    """Deletes a hold; a missing or already swept one is not an error."""
+    if hold_id:
+        BookingHold.objects.filter(pk=hold_id).delete()
+
+
+def sweep_expired_holds():
+    """Deletes every lapsed hold with one indexed DELETE. Returns how many."""
+    deleted, _ = BookingHold.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
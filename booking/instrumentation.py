@@ -0,0 +1,166 @@
+"""
+Per-request timing: database, Stripe, SMTP and template rendering.
+
+ServerTimingMiddleware starts a RequestMetrics for each request in a
+context variable. The database wrapper, the template render hook and
+`track()` add to it. Context variables follow the request into
+sync_to_async / to_thread, so work done off the request thread is
+counted too. It is async-capable, so async views such as book_view keep
+running on the event loop. The totals go out as a Server-Timing header
+and one structured log line. Requests over the query threshold are logged at
+WARNING, which makes N+1 regressions easy to spot.
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db import connection
+from django.template.backends.django import Template as DjangoTemplate
+import json
+import logging
+import time
+
+
+logger = logging.getLogger('booking.timing')
+
+_current = ContextVar('booking_request_metrics', default=None)
+
+
+@dataclass
+class RequestMetrics:
+    db_queries: int = 0
+    db_ms: float = 0.0
+    stripe_calls: int = 0
+    stripe_ms: float = 0.0
+    smtp_calls: int = 0
+    smtp_ms: float = 0.0
+    render_ms: float = 0.0
+
+    def server_timing(self, total_ms):
+        return ', '.join([
+            f'db;dur={self.db_ms:.1f};desc="{self.db_queries} queries"',
+            f'stripe;dur={self.stripe_ms:.1f};desc="{self.stripe_calls} calls"',
+            f'smtp;dur={self.smtp_ms:.1f};desc="{self.smtp_calls} calls"',
+            f'render;dur={self.render_ms:.1f}',
+            f'total;dur={total_ms:.1f}',
+        ])
+
+
+@contextmanager
+def track(kind):
+    """
+    Times the block as a `kind` call ('stripe' or 'smtp') on the current
+    request, if there is one.
+    """
+    metrics = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            setattr(metrics, f'{kind}_calls', getattr(metrics, f'{kind}_calls') + 1)
+            setattr(metrics, f'{kind}_ms', getattr(metrics, f'{kind}_ms') + (time.perf_counter() - started) * 1000)
+
+
+def _db_wrapper(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_queries += 1
+        metrics.db_ms += (time.perf_counter() - started) * 1000
+
+
+def _install_db_wrapper(conn):
+    if _db_wrapper not in conn.execute_wrappers:
+        conn.execute_wrappers.append(_db_wrapper)
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    _install_db_wrapper(connection)
+
+
+def _install_render_hook():
+    # The backend Template.render runs once per render()/TemplateResponse;
+    # {% include %} and {% extends %} go through the engine template instead,
+    # so nested templates are not counted twice.
+    if getattr(DjangoTemplate.render, '_timed', False):
+        return
+    original = DjangoTemplate.render
+
+    def render(self, *args, **kwargs):
+        metrics = _current.get()
+        if metrics is None:
+            return original(self, *args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return original(self, *args, **kwargs)
+        finally:
+            metrics.render_ms += (time.perf_counter() - started) * 1000
+
+    render._timed = True
+    DjangoTemplate.render = render
+
+
+class ServerTimingMiddleware:
+    # Listed first in MIDDLEWARE: a sync-only middleware there would run
+    # the whole stack, async views included, in a thread per request
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        connection_created.connect(_on_connection_created, dispatch_uid='booking.instrumentation')
+        _install_db_wrapper(connection)  # Already open in this thread, e.g. under the test runner
+        _install_render_hook()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, started)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, started)
+
+    def finish(self, request, response, metrics, started):
+        total_ms = (time.perf_counter() - started) * 1000
+        response['Server-Timing'] = metrics.server_timing(total_ms)
+        self.log(request, response, metrics, total_ms)
+        return response
+
+    def log(self, request, response, metrics, total_ms):
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 1),
+            **{k: round(v, 1) if isinstance(v, float) else v for k, v in asdict(metrics).items()},
+        }
+        over_queries = metrics.db_queries > settings.SERVER_TIMING_QUERY_THRESHOLD
+        over_time = total_ms > settings.SERVER_TIMING_SLOW_MS
+        if over_queries or over_time:
+            record['threshold_exceeded'] = [name for name, hit in (('queries', over_queries), ('time', over_time)) if hit]
+            logger.warning(json.dumps(record))
+        else:
+            logger.info(json.dumps(record))
@@ -0,0 +1,190 @@
+from booking.benchmarks import percentile, throwaway_database
+from booking.models import (
+    AvailabilityConfig, Booking, NightOccupancy, OwnerProfile, PricingConfig, PricingRule, Property, User,
+    get_default_property_id,
+)
+from booking.utils import are_dates_available, bump_data_version, get_max_bookable_date
+from datetime import date, datetime, timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from unittest.mock import patch
+import json
+import time
+import tracemalloc
+
+
+STAY_NIGHTS = 3
+STAY_SPACING = 4  # One free night between seeded stays
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a throwaway database and reports latency percentiles, queries per request and "
+        "peak memory for the booking hot paths, as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bookings', type=int, default=1000, help="Paid bookings to seed (mostly history).")
+        parser.add_argument('--rules', type=int, default=200, help="Date-specific pricing rules to seed.")
+        parser.add_argument('--months', type=int, default=12, help="Booking window in months (AvailabilityConfig).")
+        parser.add_argument('--properties', type=int, default=1,
+                            help="Properties seeded with the same data; the default one is measured.")
+        parser.add_argument('--iterations', type=int, default=50, help="Timed requests per endpoint.")
+        parser.add_argument('--warmup', type=int, default=2, help="Untimed requests per endpoint before measuring.")
+        parser.add_argument('--output', help="Also write the JSON report to this file.")
+
+    def handle(self, *args, **options):
+        with throwaway_database():
+            self.seed(options['bookings'], options['rules'], options['months'], options['properties'])
+            report = {
+                'generated_at': datetime.now().isoformat(timespec='seconds'),
+                'params': {k: options[k] for k in ('bookings', 'rules', 'months', 'properties', 'iterations', 'warmup')},
+                'endpoints': {
+                    name: self.measure(request, options['iterations'], options['warmup'])
+                    for name, request in self.endpoints().items()
+                },
+            }
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+        self.stdout.write(output)
+
+    def seed(self, bookings, rules, months, properties):
+        default = Property.objects.get(pk=get_default_property_id())
+        for prop in [default] + [
+            Property.objects.create(name=f'Listing {i}', slug=f'listing-{i}') for i in range(1, properties)
+        ]:
+            self.seed_property(prop, bookings, rules, months)
+
+        self.owner = User.objects.create_user(username='bench-owner', password='bench')
+        OwnerProfile.objects.create(user=self.owner, name='Bench Owner')
+
+        # A free two-night stay for the booking form
+        today = date.today()
+        self.free_check_in = next(
+            today + timedelta(days=i) for i in range(1, 400)
+            if are_dates_available(today + timedelta(days=i), today + timedelta(days=i + 2))
+        )
+        self.webhook_check_in = get_max_bookable_date() + timedelta(days=30)
+
+    def seed_property(self, prop, bookings, rules, months):
+        today = date.today()
+        PricingConfig.objects.create(property=prop, base_rate=120)
+        AvailabilityConfig.objects.create(property=prop, months_ahead=months)
+        max_date = get_max_bookable_date(prop.pk)
+
+        PricingRule.objects.bulk_create([
+            PricingRule(property=prop, date=today + timedelta(days=i * 2), rate=100 + i % 80) for i in range(rules)
+        ])
+
+        # Non-overlapping stays walking back from the end of the window, so
+        # most of them are past history and the window is partly booked.
+        seeded = Booking.objects.bulk_create([
+            Booking(
+                property=prop, name=f'Guest {i}', email=f'guest{i}@example.com', paid=True, total_price=360,
+                check_in=max_date - timedelta(days=STAY_SPACING * (i + 1)),
+                check_out=max_date - timedelta(days=STAY_SPACING * (i + 1) - STAY_NIGHTS),
+            )
+            for i in range(bookings)
+        ])
+        NightOccupancy.objects.bulk_create([
+            NightOccupancy(property=prop, booking=booking, date=booking.check_in + timedelta(days=n))
+            for booking in seeded for n in range(STAY_NIGHTS)
+        ])
+        bump_data_version(prop.pk)  # bulk_create skips the signals
+
+    def endpoints(self):
+        guest = Client()
+        owner = Client()
+        owner.force_login(self.owner)
+        webhook_counter = iter(range(10 ** 9))
+
+        def book_view():
+            # Holds lapse at once, so every iteration finds the same stay free
+            with patch('booking.views.stripe.checkout.Session.create') as create, \
+                    override_settings(BOOKING_HOLD_MINUTES=0):
+                create.return_value.url = 'https://checkout.stripe.com/bench'
+                return guest.post(reverse('book'), {
+                    'name': 'Bench Guest',
+                    'email': 'bench@example.com',
+                    'check_in': self.free_check_in.isoformat(),
+                    'check_out': (self.free_check_in + timedelta(days=2)).isoformat(),
+                })
+
+        def stripe_webhook():
+            # Each delivery is a new event for new dates beyond the window
+            n = next(webhook_counter)
+            check_in = self.webhook_check_in + timedelta(days=STAY_SPACING * n)
+            event = {
+                'id': f'evt_bench_{n}',
+                'type': 'checkout.session.completed',
+                'data': {'object': {'metadata': {
+                    'name': 'Webhook Guest',
+                    'email': 'webhook@example.com',
+                    'check_in': check_in.isoformat(),
+                    'check_out': (check_in + timedelta(days=STAY_NIGHTS)).isoformat(),
+                    'total_price': 360,
+                }}},
+            }
+            with patch('booking.views.stripe.Webhook.construct_event', return_value=event):
+                return guest.post(reverse('stripe-webhook'), data='{}', content_type='application/json',
+                                  HTTP_STRIPE_SIGNATURE='bench')
+
+        return {
+            'availability_json': lambda: guest.get(reverse('availability_json')),
+            'availability_json_compact': lambda: guest.get(reverse('availability_json'), {'format': 'compact'}),
+            'availability_json_stream': lambda: guest.get(reverse('availability_json'), {'stream': '1'}),
+            'owner_calendar_data': lambda: owner.get(reverse('calendar_data')),
+            'owner_dashboard': lambda: owner.get(reverse('owner_dashboard')),
+            'book_view': book_view,
+            'stripe_webhook': stripe_webhook,
+        }
+
+    @staticmethod
+    def read_body(response):
+        """Reads the body like a client would (chunk by chunk when streamed) and returns its size."""
+        if response.streaming:
+            return sum(len(chunk) for chunk in response.streaming_content)
+        return len(response.content)
+
+    def measure(self, request, iterations, warmup):
+        for _ in range(warmup):
+            request()
+
+        latencies = []
+        queries = []
+        statuses = {}
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                response = request()
+                size = self.read_body(response)
+                latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(len(ctx.captured_queries))
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        # Memory is traced in a separate pass so tracing does not skew latency
+        tracemalloc.start()
+        peak = 0
+        try:
+            for _ in range(min(iterations, 5)):
+                tracemalloc.reset_peak()
+                self.read_body(request())
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'queries_per_request': round(sum(queries) / len(queries), 2),
+            'peak_memory_kib': round(peak / 1024, 1),
+            'response_bytes': size,
+            'status_codes': {str(code): count for code, count in sorted(statuses.items())},
+        }
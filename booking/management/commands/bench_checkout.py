@@ -0,0 +1,84 @@
+from booking.benchmarks import sqlite_file_database
+from booking.fake_stripe import FakeStripeServer
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+import asyncio
+import json
+import time
+import stripe
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures booking submit throughput against a local fake Stripe with injected latency, "
+        "once with a fixed pool of blocking workers and once on a single event loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--latency', type=float, default=0.5, help="Fake Stripe response delay in seconds.")
+        parser.add_argument('--requests', type=int, default=40, help="Booking submissions per run.")
+        parser.add_argument('--workers', type=int, default=4, help="Size of the blocking worker pool.")
+
+    def handle(self, *args, **options):
+        server = FakeStripeServer(latency=options['latency'])
+        server.start_in_background()
+        stripe.api_base = server.url
+
+        check_in = date.today() + timedelta(days=7)
+        self.form = {
+            'name': 'Bench Guest',
+            'email': 'bench@example.com',
+            'check_in': check_in.isoformat(),
+            'check_out': (check_in + timedelta(days=2)).isoformat(),
+        }
+        self.url = reverse('book')
+
+        try:
+            # Every submission is for the same stay: let each hold lapse at
+            # once so they all get as far as Stripe. Placing holds writes
+            # from many threads, which needs the file database and the
+            # production SQLite profile rather than the in-memory test one.
+            with sqlite_file_database(**settings.SQLITE_PRODUCTION_PROFILE), \
+                    override_settings(BOOKING_HOLD_MINUTES=0):
+                results = {
+                    'stripe_latency_s': options['latency'],
+                    'requests': options['requests'],
+                    'blocking_workers': self.run_blocking(options['requests'], options['workers']),
+                    'event_loop': asyncio.run(self.run_event_loop(options['requests'])),
+                }
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def run_blocking(self, total, workers):
+        """Each worker thread serves one request at a time, like a WSGI worker."""
+        def submit(_):
+            return Client().post(self.url, self.form).status_code
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            statuses = list(pool.map(submit, range(total)))
+        return self.summarise(statuses, time.perf_counter() - started, workers=workers)
+
+    async def run_event_loop(self, total):
+        """All requests share one event loop, like an ASGI worker."""
+        client = AsyncClient()
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(client.post(self.url, self.form) for _ in range(total)))
+        return self.summarise([r.status_code for r in responses], time.perf_counter() - started)
+
+    def summarise(self, statuses, elapsed, **extra):
+        return {
+            **extra,
+            'elapsed_s': round(elapsed, 3),
+            'throughput_rps': round(len(statuses) / elapsed, 2),
+            'redirected_to_stripe': statuses.count(303),
+            'retry_page': statuses.count(503),
+            'other': len(statuses) - statuses.count(303) - statuses.count(503),
+        }
@@ -0,0 +1,140 @@
+from booking.benchmarks import percentile, sqlite_file_database
+from booking.models import AvailabilityConfig, Booking, PricingConfig
+from datetime import date, timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.test import Client
+from django.urls import reverse
+from itertools import count
+from unittest.mock import patch
+import json
+import logging
+import threading
+import time
+
+
+# The "before" run: Django's SQLite defaults (rollback journal, deferred
+# transactions, 5 s busy timeout, a new connection per request)
+BASELINE_PROFILE = {'OPTIONS': {}, 'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False}
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs concurrent Stripe webhook writes against calendar reads on a SQLite file, with the "
+        "default connection settings and with SQLITE_PRODUCTION_PROFILE, and reports throughput "
+        "and error rates as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4, help="Threads posting webhook bookings.")
+        parser.add_argument('--readers', type=int, default=8, help="Threads fetching the availability feed.")
+        parser.add_argument('--duration', type=float, default=10.0, help="Seconds per profile.")
+        parser.add_argument('--output', help="Also write the JSON report to this file.")
+
+    def handle(self, *args, **options):
+        profiles = {'baseline': BASELINE_PROFILE, 'production': settings.SQLITE_PRODUCTION_PROFILE}
+        report = {
+            'params': {k: options[k] for k in ('writers', 'readers', 'duration')},
+            'profiles': {},
+        }
+        # Webhook signatures are not what is measured here, and the
+        # "database is locked" tracebacks are counted rather than logged
+        logging.disable(logging.ERROR)
+        try:
+            with patch('booking.views.stripe.Webhook.construct_event',
+                       side_effect=lambda payload, *args: json.loads(payload)):
+                for name, profile in profiles.items():
+                    with sqlite_file_database(**profile):
+                        self.seed()
+                        report['profiles'][name] = self.run(options['writers'], options['readers'], options['duration'])
+        finally:
+            logging.disable(logging.NOTSET)
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+        self.stdout.write(output)
+
+    def seed(self):
+        PricingConfig.objects.create(base_rate=120)
+        AvailabilityConfig.objects.create(months_ahead=12)
+        today = date.today()
+        for i in range(20):
+            check_in = today + timedelta(days=i * 7)
+            Booking.objects.create(
+                name=f'Guest {i}', email=f'guest{i}@example.com', paid=True,
+                check_in=check_in, check_out=check_in + timedelta(days=3),
+            )
+        connection.close()
+
+    def run(self, writers, readers, duration):
+        events = count()
+        first_check_in = date.today() + timedelta(days=800)  # Clear of the seeded stays
+        stop = threading.Event()
+        results = {'write': [], 'read': []}
+        lock = threading.Lock()
+
+        def write(client):
+            n = next(events)
+            check_in = first_check_in + timedelta(days=3 * n)
+            event = {
+                'id': f'evt_contention_{n}',
+                'type': 'checkout.session.completed',
+                'data': {'object': {'metadata': {
+                    'name': 'Webhook Guest',
+                    'email': 'webhook@example.com',
+                    'check_in': check_in.isoformat(),
+                    'check_out': (check_in + timedelta(days=2)).isoformat(),
+                    'total_price': 240,
+                }}},
+            }
+            return client.post(reverse('stripe-webhook'), data=json.dumps(event),
+                               content_type='application/json', HTTP_STRIPE_SIGNATURE='bench')
+
+        def read(client):
+            return client.get(reverse('availability_json'))
+
+        def worker(kind, request):
+            client = Client(raise_request_exception=False)
+            samples = []
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    ok = request(client).status_code < 400
+                except Exception:
+                    ok = False
+                samples.append(((time.perf_counter() - started) * 1000, ok))
+                # What the request handler does after every response; the
+                # test client skips it
+                close_old_connections()
+            connection.close()
+            with lock:
+                results[kind].extend(samples)
+
+        threads = [threading.Thread(target=worker, args=('write', write)) for _ in range(writers)]
+        threads += [threading.Thread(target=worker, args=('read', read)) for _ in range(readers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        return {kind: self.summarise(samples, elapsed) for kind, samples in results.items()}
+
+    def summarise(self, samples, elapsed):
+        latencies = [ms for ms, _ in samples] or [0]
+        succeeded = sum(1 for _, ok in samples if ok)
+        return {
+            'requests': len(samples),
+            'succeeded': succeeded,
+            'errors': len(samples) - succeeded,
+            'error_rate': round((len(samples) - succeeded) / len(samples), 4) if samples else 0,
+            'throughput_rps': round(succeeded / elapsed, 2),
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+        }
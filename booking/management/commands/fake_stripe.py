@@ -0,0 +1,21 @@
+from booking.fake_stripe import FakeStripeServer
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Runs a local fake Stripe API with configurable latency (set STRIPE_API_BASE to its URL)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=12111)
+        parser.add_argument('--latency', type=float, default=0.5, help="Seconds to wait before answering.")
+
+    def handle(self, *args, **options):
+        server = FakeStripeServer(options['host'], options['port'], options['latency'])
+        self.stdout.write(f"Fake Stripe listening on {server.url} (latency {options['latency']}s)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
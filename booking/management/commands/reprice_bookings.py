@@ -0,0 +1,33 @@
+from booking.models import Booking, Property
+from booking.pricing import reprice_bookings
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes total_price of upcoming unpaid bookings from the current rules, with one "
+        "compiled price vector per property."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--property', help="Slug of the only property to reprice.")
+        parser.add_argument('--include-paid', action='store_true',
+                            help="Also reprice paid bookings, overwriting what the guest was charged.")
+        parser.add_argument('--include-past', action='store_true', help="Also reprice stays that have ended.")
+
+    def handle(self, *args, **options):
+        bookings = Booking.objects.only('id', 'property', 'check_in', 'check_out', 'total_price')
+        if options['property']:
+            try:
+                prop = Property.objects.get(slug=options['property'])
+            except Property.DoesNotExist:
+                raise CommandError(f"No property with slug '{options['property']}'.")
+            bookings = bookings.filter(property=prop)
+        if not options['include_paid']:
+            bookings = bookings.filter(paid=False)
+        if not options['include_past']:
+            bookings = bookings.filter(check_out__gte=date.today())
+
+        changed = reprice_bookings(bookings)
+        self.stdout.write(f"Repriced {changed} booking(s)")
@@ -0,0 +1,34 @@
+from booking.outbox import OUTBOX_BATCH_SIZE, deliver_outbox
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+import time
+
+
+class Command(BaseCommand):
+    help = (
+        "Delivers queued outbox emails in batches over one reused mail connection. Workers claim their "
+        "batches, so several can run side by side."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=OUTBOX_BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds to sleep when nothing is due.")
+        parser.add_argument('--once', action='store_true', help="Drain what is due now, then exit.")
+
+    def handle(self, *args, **options):
+        connection = get_connection()
+        try:
+            while True:
+                processed = deliver_outbox(options['batch_size'], connection=connection)
+                if processed:
+                    self.stdout.write(f"Processed {processed} message(s)")
+                    continue
+                if options['once']:
+                    break
+                # Don't hold the SMTP session open while idle
+                connection.close()
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
@@ -0,0 +1,10 @@
+from booking.holds import sweep_expired_holds
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Deletes lapsed checkout holds. Cheap enough to run every few minutes from cron."
+
+    def handle(self, *args, **options):
+        deleted = sweep_expired_holds()
+        self.stdout.write(f"Swept {deleted} expired hold(s)")
@@ -0,0 +1,36 @@
+# Generated by Django 5.2 on 2026-10-16 23:42
+
+import django.db.models.deletion
+from datetime import timedelta
+from django.db import migrations, models
+
+
+def backfill_nights(apps, schema_editor):
+    """Creates occupancy rows for existing paid bookings, oldest first."""
+    Booking = apps.get_model('booking', 'Booking')
+    NightOccupancy = apps.get_model('booking', 'NightOccupancy')
+    nights = []
+    for booking in Booking.objects.filter(paid=True).order_by('created_at'):
+        for i in range((booking.check_out - booking.check_in).days):
+            nights.append(NightOccupancy(date=booking.check_in + timedelta(days=i), booking=booking))
+    # Legacy data may already contain double bookings; the earliest one keeps the night.
+    NightOccupancy.objects.bulk_create(nights, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0002_availabilityconfig'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NightOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='nights', to='booking.booking')),
+            ],
+        ),
+        migrations.RunPython(backfill_nights, migrations.RunPython.noop),
+    ]
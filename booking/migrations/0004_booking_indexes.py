@@ -0,0 +1,21 @@
+# Generated by Django 5.2 on 2026-10-16 23:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0003_nightoccupancy'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['paid', 'check_in', 'check_out'], name='booking_paid_stay_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['check_out', 'check_in'], name='booking_checkout_idx'),
+        ),
+    ]
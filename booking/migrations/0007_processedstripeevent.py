@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-16 23:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0006_emailoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessedStripeEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=255, unique=True)),
+                ('event_type', models.CharField(max_length=100)),
+                ('outcome', models.CharField(choices=[('processed', 'Processed'), ('conflict', 'Dates already booked'), ('ignored', 'Ignored event type'), ('error', 'Error')], max_length=10)),
+                ('duration_ms', models.PositiveIntegerField(default=0)),
+                ('processed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['event_type', 'processed_at'], name='stripe_event_type_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,128 @@
+# Generated by Django 5.2 on 2026-10-17 10:12
+
+import booking.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+PROPERTY_MODELS = ['Booking', 'NightOccupancy', 'PricingRule', 'RateRule', 'PricingConfig', 'AvailabilityConfig']
+
+
+def create_default_property(apps, schema_editor):
+    """
+    Moves the existing single-listing data onto a default property. Config
+    becomes one row per property, so extra legacy rows are dropped (the
+    app always read the first one). Data versions restart from zero.
+    """
+    Property = apps.get_model('booking', 'Property')
+    default, _ = Property.objects.get_or_create(slug='navona-romantica', defaults={'name': 'Navona Romantica'})
+    for model_name in PROPERTY_MODELS:
+        apps.get_model('booking', model_name).objects.update(property=default)
+    for model_name in ['PricingConfig', 'AvailabilityConfig']:
+        model = apps.get_model('booking', model_name)
+        first = model.objects.order_by('pk').first()
+        if first:
+            model.objects.exclude(pk=first.pk).delete()
+    apps.get_model('booking', 'DataVersion').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0008_raterule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Property',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('slug', models.SlugField(unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('owner', models.ForeignKey(blank=True, help_text='Leave empty to let every owner and collaborator manage it.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='properties', to='booking.ownerprofile')),
+            ],
+            options={
+                'verbose_name_plural': 'properties',
+            },
+        ),
+        *[
+            migrations.AddField(
+                model_name=model_name.lower(),
+                name='property',
+                field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='booking.property'),
+            )
+            for model_name in PROPERTY_MODELS
+        ],
+        migrations.RunPython(create_default_property, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='booking_paid_stay_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='booking_checkout_idx',
+        ),
+        migrations.AlterField(
+            model_name='nightoccupancy',
+            name='date',
+            field=models.DateField(),
+        ),
+        migrations.AlterField(
+            model_name='pricingrule',
+            name='date',
+            field=models.DateField(),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='property',
+            field=models.ForeignKey(default=booking.models.get_default_property_id, on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='booking.property'),
+        ),
+        migrations.AlterField(
+            model_name='nightoccupancy',
+            name='property',
+            field=models.ForeignKey(default=booking.models.get_default_property_id, on_delete=django.db.models.deletion.CASCADE, related_name='occupied_nights', to='booking.property'),
+        ),
+        migrations.AlterField(
+            model_name='pricingrule',
+            name='property',
+            field=models.ForeignKey(default=booking.models.get_default_property_id, on_delete=django.db.models.deletion.CASCADE, related_name='pricing_rules', to='booking.property'),
+        ),
+        migrations.AlterField(
+            model_name='raterule',
+            name='property',
+            field=models.ForeignKey(default=booking.models.get_default_property_id, on_delete=django.db.models.deletion.CASCADE, related_name='rate_rules', to='booking.property'),
+        ),
+        migrations.AlterField(
+            model_name='pricingconfig',
+            name='property',
+            field=models.OneToOneField(default=booking.models.get_default_property_id, on_delete=django.db.models.deletion.CASCADE, related_name='pricing_config', to='booking.property'),
+        ),
+        migrations.AlterField(
+            model_name='availabilityconfig',
+            name='property',
+            field=models.OneToOneField(default=booking.models.get_default_property_id, on_delete=django.db.models.deletion.CASCADE, related_name='availability_config', to='booking.property'),
+        ),
+        migrations.AddField(
+            model_name='dataversion',
+            name='property',
+            field=models.OneToOneField(default=None, on_delete=django.db.models.deletion.CASCADE, related_name='data_version', to='booking.property'),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['property', 'paid', 'check_in', 'check_out'], name='booking_prop_paid_stay_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['property', 'check_out', 'check_in'], name='booking_prop_checkout_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='nightoccupancy',
+            constraint=models.UniqueConstraint(fields=('property', 'date'), name='night_property_date_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='pricingrule',
+            constraint=models.UniqueConstraint(fields=('property', 'date'), name='pricingrule_property_date_uniq'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2 on 2026-10-17 00:16
+
+import booking.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0009_property'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('check_in', models.DateField()),
+                ('check_out', models.DateField()),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('property', models.ForeignKey(default=booking.models.get_default_property_id, on_delete=django.db.models.deletion.CASCADE, related_name='holds', to='booking.property')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['property', 'expires_at', 'check_in'], name='hold_prop_expiry_idx'), models.Index(fields=['expires_at'], name='hold_expiry_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-17 00:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0010_bookinghold'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['property', 'check_in'], name='booking_prop_checkin_idx'),
+        ),
+    ]
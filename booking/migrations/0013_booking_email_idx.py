@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-17 00:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0012_user_role_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['email'], name='booking_email_idx'),
+        ),
+    ]
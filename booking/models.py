@@ -1,12 +1,28 @@
+from datetime import date, timedelta
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.utils import timezone
 from django.conf import settings
 
 
 # Custom user model
 class User(AbstractUser):
-    # Add custom fields if any
-    pass
+    # Moved by booking.signals whenever the user's OwnerProfile or
+    # Collaborator row changes; a cached Role is only trusted under the
+    # version it was resolved with (see utils.get_user_role)
+    role_version = models.PositiveIntegerField(default=0, editable=False)
+
+    def save(self, *args, **kwargs):
+        # A full save of an instance loaded before a role change must not
+        # move role_version back to a value older roles are cached under
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'role_version'
+            ]
+        super().save(*args, **kwargs)
 
 class OwnerProfile(models.Model):
     user = models.OneToOneField(
@@ -33,7 +49,50 @@ class Collaborator(models.Model):
     def __str__(self):
         return f"{self.user.email} (collaborator of {self.owner.name})"
 
+class Property(models.Model):
+    """
+    A listing. Bookings, prices and config all belong to one property;
+    the oldest one is served by the unscoped URLs.
+    """
+    owner = models.ForeignKey(
+        OwnerProfile,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='properties',
+        help_text='Leave empty to let every owner and collaborator manage it.'
+    )
+    name = models.CharField(max_length=255)
+    slug = models.SlugField(unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = 'properties'
+
+    def __str__(self):
+        return self.name
+
+DEFAULT_PROPERTY_CACHE_KEY = 'booking:default-property-id'
+
+def get_default_property_id():
+    """
+    Primary key of the oldest property, used as the default for every
+    property FK. Cached; booking.signals drops it when properties change.
+    """
+    property_id = cache.get(DEFAULT_PROPERTY_CACHE_KEY)
+    if property_id is None:
+        property_id = Property.objects.order_by('pk').values_list('pk', flat=True).first()
+        if property_id is not None:
+            cache.set(DEFAULT_PROPERTY_CACHE_KEY, property_id, None)
+    return property_id
+
 class Booking(models.Model):
+    property = models.ForeignKey(
+        Property,
+        on_delete=models.CASCADE,
+        default=get_default_property_id,
+        related_name='bookings'
+    )
     name = models.CharField(max_length=100)
     email = models.EmailField()
     check_in = models.DateField()
@@ -42,20 +101,190 @@ class Booking(models.Model):
     paid = models.BooleanField(default=False)
     total_price = models.DecimalField(max_digits=8, decimal_places=2, blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # Every hot query is scoped to one property first.
+            # Overlap lookups: paid=True AND check_in < x AND check_out > y,
+            # covering the (check_in, check_out) columns the feeds read.
+            models.Index(fields=['property', 'paid', 'check_in', 'check_out'], name='booking_prop_paid_stay_idx'),
+            # Dashboard: check_out >= today ORDER BY check_in
+            models.Index(fields=['property', 'check_out', 'check_in'], name='booking_prop_checkout_idx'),
+            # Dashboard month pages: a check_in range in (check_in, id)
+            # keyset order, which the implicit rowid completes
+            models.Index(fields=['property', 'check_in'], name='booking_prop_checkin_idx'),
+            # Admin search by the guest's exact e-mail, across properties
+            models.Index(fields=['email'], name='booking_email_idx'),
+            # Admin paid filter and date drill-down, across properties
+            models.Index(fields=['paid', 'check_in'], name='booking_paid_checkin_idx'),
+            models.Index(fields=['check_in'], name='booking_checkin_idx'),
+        ]
+
+    def clean(self):
+        if self.paid and self.check_in and self.check_out:
+            taken = NightOccupancy.objects.filter(
+                property_id=self.property_id, date__gte=self.check_in, date__lt=self.check_out
+            ).exclude(booking_id=self.pk)
+            if taken.exists():
+                raise ValidationError('These dates are already booked.')
+            if BookingHold.objects.active().overlapping(self.property_id, self.check_in, self.check_out).exists():
+                raise ValidationError('These dates are being paid for by another guest.')
+
+    # Fields whose loaded values are remembered, to tell what a save changes
+    TRACKED_FIELDS = ('property_id', 'check_in', 'check_out', 'paid', 'total_price')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {
+            name: value for name, value in zip(field_names, values)
+            if name in cls.TRACKED_FIELDS and value is not models.DEFERRED
+        }
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        refreshed = self.TRACKED_FIELDS if fields is None else {self._meta.get_field(f).attname for f in fields}
+        self._loaded_values = {
+            **getattr(self, '_loaded_values', {}),
+            **{name: getattr(self, name) for name in self.TRACKED_FIELDS if name in refreshed},
+        }
+
+    def changed_fields(self):
+        """
+        The TRACKED_FIELDS that differ from the values last loaded from or
+        saved to the database; all of them for an unsaved booking.
+        """
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return set(self.TRACKED_FIELDS)
+        return {name for name, value in loaded.items() if getattr(self, name) != value}
+
+    def needs_repricing(self, changed):
+        """
+        A new booking without a price, or a stay moved to other dates (or
+        another property) without a new price being set along with it.
+        """
+        if not (self.check_in and self.check_out):
+            return False
+        if self._state.adding:
+            return self.total_price is None
+        return bool(changed & {'property_id', 'check_in', 'check_out'}) and 'total_price' not in changed
+
     def save(self, *args, **kwargs):
-        if self.check_in and self.check_out:
+        changed = self.changed_fields()
+        if self.needs_repricing(changed):
             from .utils import calculate_total_price  # the import is moved here in order to avoid circular import ⬅️ 
-            self.total_price = calculate_total_price(self.check_in, self.check_out)
-        super().save(*args, **kwargs)
+            self.total_price = calculate_total_price(self.check_in, self.check_out, self.property_id)
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'total_price'}
+        # The booking and its nights are written together, so a clash on
+        # a (property, date) night rolls the booking back as well.
+        with transaction.atomic():
+            adding = self._state.adding
+            super().save(*args, **kwargs)
+            # Edits to the guest's details leave the nights as they are
+            if adding or changed & {'property_id', 'check_in', 'check_out', 'paid'}:
+                self.sync_nights()
+        self._loaded_values = {name: getattr(self, name) for name in self.TRACKED_FIELDS}
+
+    def sync_nights(self):
+        """
+        Rewrites the NightOccupancy rows of this booking: one per night
+        if paid, none otherwise. Raises IntegrityError when a night is
+        already held by another booking.
+        """
+        self.nights.all().delete()
+        if self.paid and self.check_in and self.check_out:
+            NightOccupancy.objects.bulk_create([
+                NightOccupancy(property_id=self.property_id, date=self.check_in + timedelta(days=i), booking=self)
+                for i in range((self.check_out - self.check_in).days)
+            ])
 
     def __str__(self):
         return f"{self.name} - {self.check_in} to {self.check_out}"
 
+class NightOccupancy(models.Model):
+    """
+    One row per night taken by a paid booking. The unique constraint on
+    (property, date) is what guarantees that two bookings of the same
+    property can never share a night.
+    """
+    property = models.ForeignKey(
+        Property,
+        on_delete=models.CASCADE,
+        default=get_default_property_id,
+        related_name='occupied_nights'
+    )
+    date = models.DateField()
+    booking = models.ForeignKey(
+        Booking,
+        on_delete=models.CASCADE,
+        related_name='nights'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['property', 'date'], name='night_property_date_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.date}: booking #{self.booking_id}"
+
+class BookingHoldQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(expires_at__gt=timezone.now())
+
+    def overlapping(self, property_id, check_in, check_out):
+        return self.filter(property_id=property_id, check_in__lt=check_out, check_out__gt=check_in)
+
+
+class BookingHold(models.Model):
+    """
+    Keeps the nights of a stay off the market while the guest pays for it.
+    Placed by book_view before the Stripe Checkout session is created,
+    released by the webhook in the transaction that creates the booking,
+    and otherwise left to expire along with the session.
+    """
+    property = models.ForeignKey(
+        Property,
+        on_delete=models.CASCADE,
+        default=get_default_property_id,
+        related_name='holds'
+    )
+    check_in = models.DateField()
+    check_out = models.DateField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = BookingHoldQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Overlap lookups: unexpired holds of a property, per stay
+            models.Index(fields=['property', 'expires_at', 'check_in'], name='hold_prop_expiry_idx'),
+            # sweep_holds: expires_at <= now across properties
+            models.Index(fields=['expires_at'], name='hold_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"Hold {self.check_in} to {self.check_out} until {self.expires_at:%Y-%m-%d %H:%M}"
+
 class PricingRule(models.Model):
-    date = models.DateField(unique=True)
+    property = models.ForeignKey(
+        Property,
+        on_delete=models.CASCADE,
+        default=get_default_property_id,
+        related_name='pricing_rules'
+    )
+    date = models.DateField()
     rate = models.DecimalField(max_digits=6, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['property', 'date'], name='pricingrule_property_date_uniq'),
+        ]
+
     def clean(self):
         if self.rate < 0:
             raise ValidationError({'price': 'Price cannot be negative.'})
@@ -67,12 +296,224 @@ class PricingRule(models.Model):
     def __str__(self):
         return f"{self.date}: {self.rate}€"
 
+class RateRule(models.Model):
+    """
+    Recurring or seasonal nightly rate.
+
+    - season: applies every day from start_date to end_date (inclusive)
+    - weekday: applies on the listed weekdays, optionally only between
+      start_date and end_date (e.g. a summer weekend uplift)
+
+    Precedence, highest first: specific-date PricingRule, weekday rules,
+    season rules, then the base rate. Within a tier the higher priority
+    wins, then the newer rule.
+    """
+    KIND_SEASON = 'season'
+    KIND_WEEKDAY = 'weekday'
+    KIND_CHOICES = [
+        (KIND_SEASON, 'Season (date range)'),
+        (KIND_WEEKDAY, 'Weekdays'),
+    ]
+    # Tier used for precedence: higher tiers override lower ones
+    KIND_TIERS = {KIND_SEASON: 1, KIND_WEEKDAY: 2}
+
+    property = models.ForeignKey(
+        Property,
+        on_delete=models.CASCADE,
+        default=get_default_property_id,
+        related_name='rate_rules'
+    )
+    name = models.CharField(max_length=100)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    start_date = models.DateField(null=True, blank=True)
+    end_date = models.DateField(null=True, blank=True)
+    weekdays = models.CharField(
+        max_length=13, blank=True,
+        help_text='Comma-separated weekdays, 0 = Monday ... 6 = Sunday (weekday rules only).'
+    )
+    rate = models.DecimalField(max_digits=6, decimal_places=2)
+    priority = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def clean(self):
+        errors = {}
+        if self.rate is not None and self.rate < 0:
+            errors['rate'] = 'Price cannot be negative.'
+        if self.kind == self.KIND_SEASON:
+            if not (self.start_date and self.end_date):
+                errors['end_date'] = 'Seasons need a start and an end date.'
+            if self.weekdays:
+                errors['weekdays'] = 'Use a weekday rule to price specific weekdays.'
+        if self.kind == self.KIND_WEEKDAY:
+            try:
+                if not self.weekday_set():
+                    errors['weekdays'] = 'Pick at least one weekday.'
+            except ValueError:
+                errors['weekdays'] = 'Use numbers from 0 (Monday) to 6 (Sunday), separated by commas.'
+        if self.start_date and self.end_date and self.end_date < self.start_date:
+            errors['end_date'] = 'End date must not be before start date.'
+        if errors:
+            raise ValidationError(errors)
+
+    def save(self, *args, **kwargs):
+        self.full_clean()  # Ensures `clean()` runs on save
+        super().save(*args, **kwargs)
+
+    def weekday_set(self):
+        """The weekdays this rule applies on; None means every day."""
+        if not self.weekdays:
+            return None
+        days = frozenset(int(day) for day in self.weekdays.split(',') if day.strip())
+        if not days <= set(range(7)):
+            raise ValueError(f"Invalid weekdays: {self.weekdays}")
+        return days
+
+    def precedence(self):
+        """Sort key: rules later in this order override earlier ones."""
+        return (self.KIND_TIERS[self.kind], self.priority, self.created_at, self.pk)
+
+    def __str__(self):
+        return f"{self.name}: {self.rate}€"
+
 class PricingConfig(models.Model):
+    property = models.OneToOneField(
+        Property,
+        on_delete=models.CASCADE,
+        default=get_default_property_id,
+        related_name='pricing_config'
+    )
     base_rate = models.DecimalField(max_digits=6, decimal_places=2, default=120)
-    # Optional: add FK to OwnerProfile or Property in future
 
 class AvailabilityConfig(models.Model):
+    property = models.OneToOneField(
+        Property,
+        on_delete=models.CASCADE,
+        default=get_default_property_id,
+        related_name='availability_config'
+    )
     months_ahead = models.PositiveIntegerField(default=3)
 
     def __str__(self):
-        return f"Available for {self.months_ahead} months ahead"
\ No newline at end of file
+        return f"Available for {self.months_ahead} months ahead"
+
+class DataVersion(models.Model):
+    """
+    Per-property stamp bumped whenever bookings, prices or config change.
+    The calendar feeds derive their ETag / Last-Modified from it.
+    """
+    property = models.OneToOneField(
+        Property,
+        on_delete=models.CASCADE,
+        related_name='data_version'
+    )
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"v{self.version} ({self.updated_at})"
+
+
+class MonthVersion(models.Model):
+    """
+    Per-(property, month) stamp of what the cached month snapshots show,
+    bumped by booking.signals for the months a Booking or PricingRule
+    change touches. The row dated ALL_MONTHS is bumped by base rate and
+    rate rule changes and counts for every month. See booking.snapshots.
+    """
+    ALL_MONTHS = date(1, 1, 1)
+
+    property = models.ForeignKey(
+        Property,
+        on_delete=models.CASCADE,
+        related_name='month_versions'
+    )
+    month = models.DateField()  # First day of the month, or ALL_MONTHS
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # Also the index the feeds read a range of months with
+            models.UniqueConstraint(fields=['property', 'month'], name='unique_month_version'),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} v{self.version}"
+
+
+class EmailOutbox(models.Model):
+    """
+    Outgoing email, written in the same transaction as the change that
+    triggers it and delivered later by `manage.py send_outbox`.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENDING, 'Sending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    booking = models.ForeignKey(
+        Booking,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='emails'
+    )
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    # While sending, the end of the worker's lease: another worker may
+    # claim the message again once it has passed
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_by = models.CharField(max_length=32, blank=True)  # Claim token of the worker sending it
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The worker polls: status IN (pending, sending) AND next_attempt_at <= now
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} → {self.to_email} ({self.status})"
+
+
+class ProcessedStripeEvent(models.Model):
+    """
+    Ledger of handled Stripe webhook events. Stripe retries deliveries, so
+    the webhook looks the event id up here first and acknowledges repeats
+    without doing the work again.
+    """
+    OUTCOME_PROCESSED = 'processed'
+    OUTCOME_CONFLICT = 'conflict'
+    OUTCOME_IGNORED = 'ignored'
+    OUTCOME_ERROR = 'error'
+    OUTCOME_CHOICES = [
+        (OUTCOME_PROCESSED, 'Processed'),
+        (OUTCOME_CONFLICT, 'Dates already booked'),
+        (OUTCOME_IGNORED, 'Ignored event type'),
+        (OUTCOME_ERROR, 'Error'),
+    ]
+
+    event_id = models.CharField(max_length=255, unique=True)
+    event_type = models.CharField(max_length=100)
+    outcome = models.CharField(max_length=10, choices=OUTCOME_CHOICES)
+    duration_ms = models.PositiveIntegerField(default=0)
+    processed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['event_type', 'processed_at'], name='stripe_event_type_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_id} ({self.event_type}): {self.outcome}"
@@ -0,0 +1,124 @@
+"""
+Transactional email outbox.
+
+Emails are queued as EmailOutbox rows inside the transaction that creates
+the booking, so they are never lost and never sent for a rolled back
+booking. `manage.py send_outbox` drains due rows in batches over one
+reused mail connection, retrying failures with exponential backoff.
+
+A worker first claims its batch with one UPDATE (status sending, its
+claim token, a lease of OUTBOX_LEASE_SECONDS), so other workers skip
+those rows, and saves each message's result right after sending it. When
+a worker dies mid-batch, its unsent messages are claimed again once the
+lease runs out; only the one it was sending at that moment can go out
+twice.
+"""
+from .instrumentation import track
+from .models import EmailOutbox
+from datetime import timedelta
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Q
+from django.utils import timezone
+import logging
+import uuid
+
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = 50
+OUTBOX_MAX_ATTEMPTS = 5  # After this many failures a message is marked failed
+OUTBOX_RETRY_BASE_SECONDS = 60  # Backoff: 1, 2, 4, 8... minutes
+OUTBOX_LEASE_SECONDS = 5 * 60  # How long a claimed batch is reserved for its worker
+
+
+def queue_booking_confirmation(booking):
+    """Queues the confirmation email for a paid booking."""
+    return EmailOutbox.objects.create(
+        booking=booking,
+        to_email=booking.email,
+        subject='Booking Confirmation - Navona Romantica',
+        body=f"Hi {booking.name},\n\nThanks for your booking from {booking.check_in} to {booking.check_out}.\nWe look forward to welcoming you!",
+    )
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+
+
+def claim_outbox(batch_size=OUTBOX_BATCH_SIZE):
+    """
+    Reserves up to batch_size due messages for this worker: pending ones
+    and ones whose previous worker's lease ran out. Returns them, with the
+    lease end, as (messages, lease_until).
+    """
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    lease_until = now + timedelta(seconds=OUTBOX_LEASE_SECONDS)
+    due = Q(status__in=[EmailOutbox.STATUS_PENDING, EmailOutbox.STATUS_SENDING], next_attempt_at__lte=now)
+    ids = list(
+        EmailOutbox.objects.filter(due).order_by('next_attempt_at', 'id').values_list('pk', flat=True)[:batch_size]
+    )
+    if not ids:
+        return [], lease_until
+    # Re-checking `due` makes the claim conditional: rows another worker
+    # claimed since the SELECT no longer match
+    EmailOutbox.objects.filter(due, pk__in=ids).update(
+        status=EmailOutbox.STATUS_SENDING, claimed_by=token, next_attempt_at=lease_until
+    )
+    return list(EmailOutbox.objects.filter(claimed_by=token).order_by('id')), lease_until
+
+
+def deliver_outbox(batch_size=OUTBOX_BATCH_SIZE, connection=None):
+    """
+    Claims one batch of due messages, sends them and saves the result of
+    each one as soon as it is known. Reuses `connection` when given (the
+    worker keeps one open across batches). Returns the number of messages
+    claimed.
+    """
+    batch, lease_until = claim_outbox(batch_size)
+    if not batch:
+        return 0
+
+    owns_connection = connection is None
+    if owns_connection:
+        connection = get_connection()
+
+    try:
+        for message in batch:
+            if timezone.now() >= lease_until:
+                # Another worker may have claimed the rest by now
+                logger.warning(f"Outbox lease ran out; leaving {message.pk} and later messages to be claimed again")
+                break
+            message.attempts += 1
+            try:
+                # No-op while the session is up; keeps send() from opening
+                # and closing a connection per message.
+                with track('smtp'):
+                    connection.open()
+                    EmailMessage(
+                        subject=message.subject,
+                        body=message.body,
+                        to=[message.to_email],
+                        connection=connection,
+                    ).send()
+            except Exception as e:
+                logger.error(f"Outbox email {message.pk} failed (attempt {message.attempts}): {e}")
+                message.last_error = str(e)
+                if message.attempts >= OUTBOX_MAX_ATTEMPTS:
+                    message.status = EmailOutbox.STATUS_FAILED
+                else:
+                    message.status = EmailOutbox.STATUS_PENDING
+                    message.next_attempt_at = timezone.now() + retry_delay(message.attempts)
+                # The server may have dropped us; start the next message on a fresh connection
+                connection.close()
+            else:
+                message.status = EmailOutbox.STATUS_SENT
+                message.sent_at = timezone.now()
+                message.last_error = ''
+            message.claimed_by = ''
+            message.save(update_fields=['status', 'attempts', 'last_error', 'next_attempt_at', 'sent_at', 'claimed_by'])
+    finally:
+        if owns_connection:
+            connection.close()
+
+    return len(batch)
@@ -0,0 +1,150 @@
+"""
+Compiled nightly prices.
+
+The whole active rule set (base rate, RateRule seasons and weekday rules,
+specific-date PricingRule overrides) is compiled into a PriceVector: one
+price per day over a date range. The vector for the bookable window is
+compiled once per data version and kept in process memory, so quotes and
+calendar feeds read prices by list index instead of querying rules.
+Each property has its own rules, data version and cached window.
+"""
+from .models import Booking, RateRule, get_default_property_id
+from .utils import get_base_rate, get_data_version, get_max_bookable_date, get_price_overrides
+from collections import defaultdict
+from datetime import date, timedelta
+from django.db.models import Q
+import threading
+
+
+# The cached window is padded to whole calendar grids on both sides, so the
+# month views of both feeds are usually served from it.
+WINDOW_PADDING_DAYS = 42
+
+_window_lock = threading.Lock()
+_windows = {}  # property id -> (cache key, PriceVector) for its current bookable window
+
+
+class PriceVector:
+    """Per-day prices for [start, end)."""
+
+    def __init__(self, start: date, prices):
+        self.start = start
+        self.prices = list(prices)
+
+    @property
+    def end(self):
+        return self.start + timedelta(days=len(self.prices))
+
+    def covers(self, start: date, end: date):
+        return self.start <= start and end <= self.end
+
+    def price(self, target_date: date):
+        return self.prices[(target_date - self.start).days]
+
+    def nights(self, check_in: date, check_out: date):
+        """(date, price) for every night in [check_in, check_out)."""
+        offset = (check_in - self.start).days
+        return [
+            (check_in + timedelta(days=i), price)
+            for i, price in enumerate(self.prices[offset:offset + max((check_out - check_in).days, 0)])
+        ]
+
+    def total(self, check_in: date, check_out: date):
+        offset = (check_in - self.start).days
+        return sum(self.prices[offset:offset + max((check_out - check_in).days, 0)], 0)
+
+
+def compile_price_vector(start: date, end: date, property_id=None, data_version=None) -> PriceVector:
+    """
+    Evaluates every rule of a property for [start, end) in precedence
+    order: base rate, then RateRules from lowest to highest precedence,
+    then date overrides. Two queries (rules, overrides) plus the cached
+    base rate.
+    """
+    property_id = property_id or get_default_property_id()
+    days = max((end - start).days, 0)
+    prices = [get_base_rate(property_id, data_version)] * days
+
+    rules = RateRule.objects.filter(
+        Q(start_date__isnull=True) | Q(start_date__lt=end),
+        Q(end_date__isnull=True) | Q(end_date__gte=start),
+        property_id=property_id,
+    )
+    for rule in sorted(rules, key=RateRule.precedence):
+        first = max(rule.start_date or start, start)
+        last = min(rule.end_date + timedelta(days=1), end) if rule.end_date else end
+        weekdays = rule.weekday_set()
+        for i in range((first - start).days, (last - start).days):
+            if weekdays is None or (start + timedelta(days=i)).weekday() in weekdays:
+                prices[i] = rule.rate
+
+    for override_date, rate in get_price_overrides(start, end, property_id).items():
+        prices[(override_date - start).days] = rate
+
+    return PriceVector(start, prices)
+
+
+def get_window_bounds(property_id=None, data_version=None):
+    today = date.today()
+    start = today.replace(day=1) - timedelta(days=WINDOW_PADDING_DAYS)
+    end = get_max_bookable_date(property_id, data_version) + timedelta(days=1 + WINDOW_PADDING_DAYS)
+    return start, end
+
+
+def get_price_vector(start: date, end: date, data_version=None, property_id=None) -> PriceVector:
+    """
+    Returns a vector covering [start, end). Ranges inside the property's
+    bookable window share its compiled window vector, recompiled only when
+    its data version or the day changes. Other ranges are compiled on
+    demand. Pass data_version when the caller already read it.
+    """
+    property_id = property_id or get_default_property_id()
+    data_version = data_version or get_data_version(property_id)
+    window_start, window_end = get_window_bounds(property_id, data_version)
+    if not (window_start <= start and end <= window_end):
+        return compile_price_vector(start, end, property_id, data_version)
+
+    # updated_at is part of the key so a version number reused after a
+    # rollback or a database restore never matches an old vector
+    key = (data_version, window_start, window_end)
+    cached = _windows.get(property_id)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    with _window_lock:
+        cached = _windows.get(property_id)
+        if cached is None or cached[0] != key:
+            cached = _windows[property_id] = (
+                key, compile_price_vector(window_start, window_end, property_id, data_version)
+            )
+        return cached[1]
+
+
+def reprice_bookings(bookings):
+    """
+    Recomputes total_price for many bookings at once: one price vector per
+    property spanning all of their stays, then a single bulk_update of the
+    prices that changed. Querysets only need id, property_id, check_in,
+    check_out and total_price loaded. Returns how many prices changed.
+    """
+    by_property = defaultdict(list)
+    for booking in bookings:
+        by_property[booking.property_id].append(booking)
+
+    changed = []
+    for property_id, group in by_property.items():
+        prices = get_price_vector(
+            min(booking.check_in for booking in group),
+            max(booking.check_out for booking in group),
+            property_id=property_id,
+        )
+        for booking in group:
+            total = prices.total(booking.check_in, booking.check_out)
+            if booking.total_price != total:
+                booking.total_price = total
+                changed.append(booking)
+            if hasattr(booking, '_loaded_values'):
+                booking._loaded_values['total_price'] = total
+
+    Booking.objects.bulk_update(changed, ['total_price'], batch_size=500)
+    return len(changed)
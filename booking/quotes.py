@@ -0,0 +1,99 @@
+"""
+Price quotes for a stay.
+
+quote_stay checks availability and prices every night of a stay in one
+pass. Quotes are cached for QUOTE_CACHE_SECONDS under the property's data
+version and the dates, so a guest moving the dates back and forth costs
+the data version lookup only.
+
+An available quote carries a signed token binding the property, the
+dates, the total and the data version. book_view accepts it in place of
+pricing the stay again, for as long as the token is younger than
+QUOTE_TOKEN_MAX_AGE and the property's data version has not moved.
+"""
+from .pricing import get_price_vector
+from .utils import are_dates_available, get_active_holds, get_data_version, version_stamp
+from datetime import date
+from django.core import signing
+from django.core.cache import cache
+
+
+QUOTE_CACHE_KEY = 'booking:quote:{}:{}:{:%Y-%m-%d}:{:%Y-%m-%d}'  # property id, data version stamp, check-in, check-out
+QUOTE_CACHE_SECONDS = 60
+QUOTE_TOKEN_SALT = 'booking.quote'
+QUOTE_TOKEN_MAX_AGE = 15 * 60  # Seconds a guest has to submit a quoted stay
+
+
+def to_cents(amount):
+    return int(float(amount) * 100)  # Stripe expects cents as integers
+
+
+def quote_stay(property_id, check_in: date, check_out: date, data_version=None):
+    """
+    Returns the quote for [check_in, check_out) as a JSON-ready dict:
+    availability, the per-night breakdown, the total and, when the dates
+    are free, the quote token. Pass data_version when the caller already
+    read it.
+    """
+    data_version = data_version or get_data_version(property_id)
+    key = QUOTE_CACHE_KEY.format(property_id, version_stamp(data_version), check_in, check_out)
+    quote = cache.get(key)
+    if quote is None:
+        quote = build_quote(property_id, check_in, check_out, data_version)
+        cache.set(key, quote, QUOTE_CACHE_SECONDS)
+
+    # Holds do not move the data version; one placed since the quote was
+    # cached takes the dates off the market all the same
+    if quote['available'] and any(
+        held_in < check_out and held_out > check_in for held_in, held_out in get_active_holds(property_id)
+    ):
+        quote = {name: value for name, value in quote.items() if name != 'token'}
+        quote['available'] = False
+    return quote
+
+
+def build_quote(property_id, check_in: date, check_out: date, data_version):
+    nights = get_price_vector(
+        check_in, check_out, data_version=data_version, property_id=property_id
+    ).nights(check_in, check_out)
+    total = sum((price for _, price in nights), 0)
+    available = are_dates_available(check_in, check_out, property_id)
+
+    quote = {
+        'check_in': check_in.isoformat(),
+        'check_out': check_out.isoformat(),
+        'available': available,
+        'nights': [{'date': night.isoformat(), 'price': price} for night, price in nights],
+        'total': total,
+    }
+    if available:
+        quote['token'] = signing.dumps({
+            'property_id': property_id,
+            'check_in': quote['check_in'],
+            'check_out': quote['check_out'],
+            'total_amount': to_cents(total),
+            'version': version_stamp(data_version),
+        }, salt=QUOTE_TOKEN_SALT)
+    return quote
+
+
+def read_quote_token(token, property_id, check_in: date, check_out: date):
+    """
+    Returns the quoted total in cents if token is a valid, unexpired quote
+    for this stay and the property's data version has not moved since;
+    None otherwise, and the caller prices the stay itself.
+    """
+    if not token:
+        return None
+    try:
+        quoted = signing.loads(token, salt=QUOTE_TOKEN_SALT, max_age=QUOTE_TOKEN_MAX_AGE)
+    except signing.BadSignature:  # Also raised for expired tokens
+        return None
+
+    if (quoted.get('property_id'), quoted.get('check_in'), quoted.get('check_out')) != (
+        property_id, check_in.isoformat(), check_out.isoformat()
+    ):
+        return None
+    if quoted.get('version') != version_stamp(get_data_version(property_id)):
+        return None
+    return quoted.get('total_amount')
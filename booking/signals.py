@@ -0,0 +1,120 @@
+from .models import (
+    AvailabilityConfig, Booking, BookingHold, Collaborator, OwnerProfile, PricingConfig, PricingRule, Property, RateRule,
+    User,
+)
+from .snapshots import bump_all_months, bump_month_list, month_starts
+from .utils import (
+    bump_data_version, bump_role_version, invalidate_holds, invalidate_property, invalidate_site_config,
+    invalidate_user_role,
+)
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from datetime import timedelta
+from django.dispatch import receiver
+from functools import partial
+
+
+@receiver(pre_save, sender=Property)
+def property_renamed(sender, instance, **kwargs):
+    # The old slug must stop resolving as soon as it changes
+    if instance.pk:
+        old_slug = Property.objects.filter(pk=instance.pk).values_list('slug', flat=True).first()
+        if old_slug:
+            invalidate_property(old_slug)
+
+
+@receiver([post_save, post_delete], sender=Property)
+def property_changed(sender, instance, **kwargs):
+    invalidate_property(instance.slug)
+    transaction.on_commit(partial(invalidate_property, instance.slug))
+
+
+@receiver([post_save, post_delete], sender=OwnerProfile)
+@receiver([post_save, post_delete], sender=Collaborator)
+def user_role_changed(sender, instance, **kwargs):
+    # Other workers keep their cached role until the version moves
+    bump_role_version(instance.user_id)
+    invalidate_user_role(instance.user_id)
+    transaction.on_commit(partial(invalidate_user_role, instance.user_id))
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    # Also runs on login (last_login), so each new session re-resolves the
+    # role, and a reused user id never inherits a stale one
+    invalidate_user_role(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=PricingConfig)
+@receiver([post_save, post_delete], sender=AvailabilityConfig)
+def site_config_changed(sender, instance, **kwargs):
+    # Drop the entry right away for this process, and again once the
+    # transaction commits so a read inside the transaction cannot re-cache
+    # a value that other workers are not able to see yet.
+    invalidate_site_config(instance.property_id)
+    transaction.on_commit(partial(invalidate_site_config, instance.property_id))
+
+
+@receiver([post_save, post_delete], sender=BookingHold)
+def hold_changed(sender, instance, **kwargs):
+    # Holds are laid over the cached feeds at read time (see get_active_holds)
+    invalidate_holds(instance.property_id)
+    transaction.on_commit(partial(invalidate_holds, instance.property_id))
+
+
+@receiver([post_save, post_delete], sender=Booking)
+@receiver([post_save, post_delete], sender=PricingRule)
+@receiver([post_save, post_delete], sender=RateRule)
+@receiver([post_save, post_delete], sender=PricingConfig)
+@receiver([post_save, post_delete], sender=AvailabilityConfig)
+def calendar_data_changed(sender, instance, **kwargs):
+    # Rows removed along with their property have no version left to bump
+    if isinstance(kwargs.get('origin'), Property):
+        return
+    bump_data_version(instance.property_id)
+
+
+
+def calendar_span(instance):
+    """The [start, end) dates a Booking or PricingRule shows up on in the calendars."""
+    if isinstance(instance, Booking):
+        return instance.check_in, instance.check_out
+    return instance.date, instance.date + timedelta(days=1)
+
+
+@receiver(pre_save, sender=Booking)
+@receiver(pre_save, sender=PricingRule)
+def remember_calendar_span(sender, instance, **kwargs):
+    # An edit can move the row to other months; those change too
+    instance._saved_calendar_span = None
+    loaded = getattr(instance, '_loaded_values', {})
+    if sender is Booking and 'check_in' in loaded and 'check_out' in loaded:
+        # Bookings remember the dates they were loaded with (Booking.from_db)
+        instance._saved_calendar_span = (loaded['check_in'], loaded['check_out'])
+    elif instance.pk:
+        fields = ('check_in', 'check_out') if sender is Booking else ('date',)
+        row = sender.objects.filter(pk=instance.pk).values_list(*fields).first()
+        if row:
+            instance._saved_calendar_span = calendar_span(sender(**dict(zip(fields, row))))
+
+
+@receiver([post_save, post_delete], sender=Booking)
+@receiver([post_save, post_delete], sender=PricingRule)
+def calendar_months_changed(sender, instance, **kwargs):
+    # Moves the month versions the cached snapshots are keyed by (see
+    # booking.snapshots), in the same transaction as the change
+    if isinstance(kwargs.get('origin'), Property):
+        return
+    months = set()
+    for span in (calendar_span(instance), getattr(instance, '_saved_calendar_span', None)):
+        if span and all(span):
+            months.update(month_starts(*span))
+    bump_month_list(instance.property_id, sorted(months))
+
+
+@receiver([post_save, post_delete], sender=RateRule)
+@receiver([post_save, post_delete], sender=PricingConfig)
+def calendar_prices_changed(sender, instance, **kwargs):
+    if isinstance(kwargs.get('origin'), Property):
+        return
+    bump_all_months(instance.property_id)
@@ -0,0 +1,162 @@
+"""
+Per-month snapshots of the calendar feeds.
+
+Each month of each property is materialized once per kind in the cache:
+
+- public: the paid stays overlapping the month and the (night, price) of
+  every free night in it
+- owner: the month's owner calendar events, one per day
+
+Requests fetch the months their range overlaps with one get_many and
+concatenate them; only missing months are computed. Each snapshot is
+keyed by the version of its month (models.MonthVersion), read for the
+whole range with one query. booking.signals bumps the months a Booking
+or PricingRule change touches, and the ALL_MONTHS row on base rate and
+rate rule changes, so every worker's cache misses on exactly the months
+that changed, without having to hear about the change. The snapshots do
+not depend on today's date or the booking window, which the feeds apply
+when reading.
+"""
+from .models import Booking, MonthVersion
+from .pricing import get_price_vector
+from .utils import get_data_version, get_occupancy_map, iter_free_nights, version_stamp
+from datetime import date, timedelta
+from django.core.cache import cache
+from django.db.models import F, Q
+from django.utils import timezone
+
+
+SNAPSHOT_CACHE_KEY = 'booking:month:{}:{}:{}:{:%Y-%m}'  # kind, property id, month version stamp, month
+SNAPSHOT_CACHE_SECONDS = 24 * 60 * 60  # Snapshots of older versions are never read again
+KIND_PUBLIC = 'public'
+KIND_OWNER = 'owner'
+
+
+def month_starts(start: date, end: date):
+    """Yields the first day of every month overlapping [start, end)."""
+    month = start.replace(day=1)
+    while month < end:
+        yield month
+        month = next_month(month)
+
+
+def next_month(month: date):
+    return (month + timedelta(days=32)).replace(day=1)
+
+
+def build_public_month(property_id, month: date, data_version):
+    end = next_month(month)
+    booked = list(
+        Booking.objects.filter(
+            property_id=property_id, check_in__lt=end, check_out__gt=month, paid=True
+        ).order_by('check_in').values_list('check_in', 'check_out')
+    )
+    prices = get_price_vector(month, end, data_version=data_version, property_id=property_id)
+    return {
+        'booked': booked,
+        'free': [(night, prices.price(night)) for night in iter_free_nights(month, end, booked)],
+    }
+
+
+def build_owner_month(property_id, month: date, data_version):
+    end = next_month(month)
+    prices = get_price_vector(month, end, data_version=data_version, property_id=property_id)
+    occupancy = get_occupancy_map(month, end, property_id)
+
+    events = []
+    d = month
+    while d < end:
+        price = prices.price(d)
+        booking_id, guest_name = occupancy.get(d, (None, None))
+        is_booked = booking_id is not None
+        events.append({
+            'title': f"€{price}" if price else '',
+            'start': d.isoformat(),
+            'allDay': True,
+            'extendedProps': {
+                'price': price,
+                'booked': is_booked,
+                'booking_id': booking_id,
+                'guest_name': guest_name,
+            },
+            'color': '#f0f0f0' if not is_booked else '#f8d7da',
+            'textColor': '#000'
+        })
+        d += timedelta(days=1)
+    return events
+
+
+BUILDERS = {KIND_PUBLIC: build_public_month, KIND_OWNER: build_owner_month}
+
+
+def get_month_versions(property_id, months):
+    """
+    Returns {month: stamp} for the given months (in order), each combining
+    the month's own version and the ALL_MONTHS one. One range query on
+    the (property, month) index.
+    """
+    rows = {
+        month: (version, updated_at)
+        for month, version, updated_at in MonthVersion.objects.filter(
+            Q(month=MonthVersion.ALL_MONTHS) | Q(month__gte=months[0], month__lte=months[-1]),
+            property_id=property_id,
+        ).values_list('month', 'version', 'updated_at')
+    }
+    every_month = version_stamp(rows.get(MonthVersion.ALL_MONTHS, (0, None)))
+    return {month: f"{every_month}-{version_stamp(rows.get(month, (0, None)))}" for month in months}
+
+
+def get_month_snapshots(kind, property_id, start: date, end: date, data_version=None):
+    """
+    Returns the snapshots of every month overlapping [start, end), in
+    order. Cached months cost one get_many together; the missing ones are
+    built and stored. Pass data_version when the caller already read it.
+    """
+    months = list(month_starts(start, end))
+    if not months:
+        return []
+    # Read before the data the months are built from: a write landing in
+    # between can only leave a snapshot under the older stamp
+    stamps = get_month_versions(property_id, months)
+    keys = [(month, SNAPSHOT_CACHE_KEY.format(kind, property_id, stamps[month], month)) for month in months]
+    cached = cache.get_many([key for _, key in keys])
+
+    snapshots = []
+    missing = {}
+    for month, key in keys:
+        snapshot = cached.get(key)
+        if snapshot is None:
+            data_version = data_version or get_data_version(property_id)
+            snapshot = missing[key] = BUILDERS[kind](property_id, month, data_version)
+        snapshots.append(snapshot)
+    if missing:
+        cache.set_many(missing, SNAPSHOT_CACHE_SECONDS)
+    return snapshots
+
+
+def bump_dates(property_id, dates):
+    """Moves the months containing the given dates forward."""
+    bump_month_list(property_id, sorted({d.replace(day=1) for d in dates}))
+
+
+def bump_all_months(property_id):
+    """Moves every month of the property forward at once (base rate, rate rules)."""
+    bump_month_list(property_id, [MonthVersion.ALL_MONTHS])
+
+
+def bump_month_list(property_id, months):
+    """
+    Moves the version of each month (first days, or ALL_MONTHS) forward,
+    in the caller's transaction.
+    """
+    if not months:
+        return
+    updated = MonthVersion.objects.filter(property_id=property_id, month__in=months).update(
+        version=F('version') + 1, updated_at=timezone.now()
+    )
+    if updated < len(months):
+        # First change in some of these months
+        MonthVersion.objects.bulk_create(
+            [MonthVersion(property_id=property_id, month=month, version=1) for month in months],
+            ignore_conflicts=True,
+        )
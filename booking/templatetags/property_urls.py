@@ -0,0 +1,10 @@
+from booking.utils import property_reverse
+from django import template
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def property_url(context, name):
+    """{% property_url 'availability' %}: the view's URL for the current property."""
+    return property_reverse(context.get('request'), name)
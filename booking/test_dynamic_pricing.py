@@ -1,7 +1,15 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 from datetime import date, timedelta
-from booking.models import Booking, PricingConfig, PricingRule
-from booking.utils import calculate_total_price
+from decimal import Decimal
+import json
+from unittest.mock import patch
+from django.core.exceptions import ValidationError
+from booking.models import Booking, OwnerProfile, PricingConfig, PricingRule, RateRule, User
+from booking.pricing import compile_price_vector, get_price_vector, reprice_bookings
+from booking.utils import calculate_total_price, get_data_version, get_nightly_price
 
 """
 Test dynamic pricing system:
@@ -82,4 +90,202 @@ class DynamicPricingTests(TestCase):
             check_out=self.check_out,
             paid=True,
         )
-        self.assertEqual(booking.total_price, 370)
\ No newline at end of file
+        self.assertEqual(booking.total_price, 370)
+
+    def test_explicit_price_is_kept(self):
+        """A price supplied on create (e.g. from Stripe metadata) is not recomputed."""
+        booking = Booking.objects.create(
+            name="Test User", email="test@example.com",
+            check_in=self.check_in, check_out=self.check_out, total_price=300,
+        )
+        booking.refresh_from_db()
+        self.assertEqual(booking.total_price, 300)
+
+    def test_saves_that_keep_the_dates_do_not_reprice(self):
+        booking = Booking.objects.create(
+            name="Test User", email="test@example.com", check_in=self.check_in, check_out=self.check_out,
+        )
+        booking = Booking.objects.get(pk=booking.pk)
+        PricingRule.objects.create(date=self.check_in + timedelta(days=1), rate=500)
+
+        booking.name = "Renamed"
+        booking.paid = True
+        booking.save()
+        self.assertEqual(booking.total_price, 370)
+        self.assertEqual(booking.nights.count(), 3)
+
+        # Only the row and the versions are written; the nights are untouched
+        booking.email = "renamed@example.com"
+        with self.assertNumQueries(5):  # Savepoint, UPDATE, data version and month version bumps, release
+            booking.save()
+
+    def test_moving_the_dates_reprices(self):
+        booking = Booking.objects.create(
+            name="Test User", email="test@example.com", check_in=self.check_in, check_out=self.check_out,
+        )
+        booking.check_out = self.check_out + timedelta(days=1)
+        booking.save()
+        self.assertEqual(booking.total_price, 470)
+
+        # Unless a new price comes with the move
+        booking.check_out = self.check_out + timedelta(days=2)
+        booking.total_price = 50
+        booking.save()
+        self.assertEqual(booking.total_price, 50)
+
+# ░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░
+# ███ Integration Tests: Bulk Repricing
+# ░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░
+
+    def test_reprice_bookings_uses_one_vector(self):
+        for offset in range(0, 40, 4):
+            Booking.objects.create(
+                name="Guest", email="guest@example.com", total_price=1,
+                check_in=self.today + timedelta(days=offset), check_out=self.today + timedelta(days=offset + 2),
+            )
+        bookings = Booking.objects.only('id', 'property', 'check_in', 'check_out', 'total_price')
+
+        get_price_vector(self.today, self.today + timedelta(days=1))  # Compile the window vector
+
+        with self.assertNumQueries(3):  # Bookings, data version, then one UPDATE for all of them
+            self.assertEqual(reprice_bookings(bookings), 10)
+
+        for booking in Booking.objects.all():
+            self.assertEqual(booking.total_price, calculate_total_price(booking.check_in, booking.check_out))
+        self.assertEqual(reprice_bookings(Booking.objects.all()), 0)
+
+# ░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░
+# ███ Integration Tests: Bulk Price Updates
+# ░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░
+
+class BulkPriceUpdateTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user(username='owner', password='secret')
+        OwnerProfile.objects.create(user=owner, name='Owner')
+        self.client.force_login(owner)
+        self.start = date(2030, 6, 3)  # a Monday
+
+    def post(self, payload):
+        return self.client.post(reverse('update_prices'), data=json.dumps(payload), content_type='application/json')
+
+    def test_range_sets_every_day_in_one_statement(self):
+        """A 90-day season is one request and a constant number of queries."""
+        PricingRule.objects.create(date=self.start + timedelta(days=10), rate=80)
+        payload = {'start': self.start.isoformat(), 'end': (self.start + timedelta(days=90)).isoformat(), 'price': '140'}
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.post(payload)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['updated'], 90)
+        self.assertEqual(PricingRule.objects.count(), 90)
+        self.assertEqual(PricingRule.objects.get(date=self.start + timedelta(days=10)).rate, 140)
+        self.assertLess(len(ctx.captured_queries), 15)
+
+    def test_weekday_mask_limits_days(self):
+        payload = {
+            'start': self.start.isoformat(),
+            'end': (self.start + timedelta(days=14)).isoformat(),
+            'weekdays': [5, 6],
+            'price': 200,
+        }
+
+        days = [d['date'] for d in self.post(payload).json()['days']]
+
+        self.assertEqual(days, ['2030-06-08', '2030-06-09', '2030-06-15', '2030-06-16'])
+
+    def test_date_list(self):
+        response = self.post({'dates': ['2030-06-05', '2030-06-01'], 'price': '99.50'})
+
+        self.assertEqual([d['date'] for d in response.json()['days']], ['2030-06-01', '2030-06-05'])
+        self.assertEqual(PricingRule.objects.get(date=date(2030, 6, 5)).rate, Decimal('99.50'))
+
+    def test_bulk_update_moves_data_version(self):
+        version, _ = get_data_version()
+        self.post({'dates': ['2030-06-05'], 'price': 120})
+        self.assertGreater(get_data_version()[0], version)
+
+    def test_rejects_negative_price_and_bad_ranges(self):
+        self.assertEqual(self.post({'dates': ['2030-06-05'], 'price': -1}).status_code, 400)
+        self.assertEqual(self.post({'start': '2030-06-05', 'end': '2030-06-01', 'price': 10}).status_code, 400)
+        self.assertEqual(self.post({'start': '2030-01-01', 'end': '2032-01-01', 'price': 10}).status_code, 400)
+        self.assertFalse(PricingRule.objects.exists())
+
+    def test_multi_year_range_is_rejected_before_expanding(self):
+        with patch('booking.views.timedelta', wraps=timedelta) as expanded:
+            response = self.post({'start': '2030-01-01', 'end': '9999-12-31', 'price': 10})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('At most', response.json()['error'])
+        expanded.assert_not_called()  # No date was built
+        self.assertEqual(self.post({'dates': ['2030-06-05'] * 400, 'price': 10}).status_code, 400)
+
+    def test_requires_owner(self):
+        self.client.logout()
+        response = self.post({'dates': ['2030-06-05'], 'price': 120})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(PricingRule.objects.exists())
+
+# ░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░
+# ███ Unit Tests: Seasons, Weekday Rules and Precedence
+# ░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░░
+
+class RateRuleTests(TestCase):
+    def setUp(self):
+        PricingConfig.objects.create(base_rate=100)
+        # Next Monday, a few weeks out so it sits inside the bookable window
+        today = date.today()
+        self.monday = today + timedelta(days=14 - today.weekday())
+        RateRule.objects.create(
+            name='Summer', kind=RateRule.KIND_SEASON, rate=150,
+            start_date=self.monday, end_date=self.monday + timedelta(days=13),
+        )
+        RateRule.objects.create(
+            name='Weekend', kind=RateRule.KIND_WEEKDAY, rate=180, weekdays='5,6',
+        )
+
+    def test_precedence_override_weekday_season_base(self):
+        """Override > weekday rule > season > base rate."""
+        PricingRule.objects.create(date=self.monday + timedelta(days=6), rate=250)  # Sunday in season
+        nights = get_price_vector(self.monday - timedelta(days=2), self.monday + timedelta(days=15)).nights(
+            self.monday - timedelta(days=2), self.monday + timedelta(days=15)
+        )
+        prices = [price for _, price in nights]
+
+        self.assertEqual(prices[:2], [180, 180])           # Weekend before the season
+        self.assertEqual(prices[2:7], [150] * 5)           # Season weekdays
+        self.assertEqual(prices[7:9], [180, 250])          # Weekend rule, then the date override
+        self.assertEqual(prices[16], 100)                  # After the season, on a Monday
+
+    def test_higher_priority_wins_within_a_tier(self):
+        RateRule.objects.create(
+            name='Peak', kind=RateRule.KIND_SEASON, rate=300, priority=5,
+            start_date=self.monday + timedelta(days=2), end_date=self.monday + timedelta(days=3),
+        )
+        self.assertEqual(get_nightly_price(self.monday + timedelta(days=1)), 150)
+        self.assertEqual(get_nightly_price(self.monday + timedelta(days=2)), 300)
+
+    def test_total_price_uses_rules(self):
+        # Friday to Monday inside the season: 150 + 180 + 180
+        friday = self.monday + timedelta(days=4)
+        self.assertEqual(calculate_total_price(friday, friday + timedelta(days=3)), 510)
+
+    def test_window_vector_is_reused_until_data_changes(self):
+        get_nightly_price(self.monday)
+        with self.assertNumQueries(1):  # Only the data version
+            get_nightly_price(self.monday + timedelta(days=1))
+
+        RateRule.objects.filter(name='Summer').get().delete()
+        self.assertEqual(get_nightly_price(self.monday + timedelta(days=1)), 100)
+
+    def test_ranges_outside_the_window_are_compiled_on_demand(self):
+        far = self.monday + timedelta(days=3 * 365)
+        vector = get_price_vector(far, far + timedelta(days=7))
+        self.assertEqual(vector.start, far)
+        self.assertEqual(vector.prices, compile_price_vector(far, far + timedelta(days=7)).prices)
+
+    def test_rule_validation(self):
+        with self.assertRaises(ValidationError):
+            RateRule.objects.create(name='No end', kind=RateRule.KIND_SEASON, rate=100, start_date=self.monday)
+        with self.assertRaises(ValidationError):
+            RateRule.objects.create(name='Bad days', kind=RateRule.KIND_WEEKDAY, rate=100, weekdays='7')
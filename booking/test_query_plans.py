@@ -0,0 +1,144 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from datetime import date, timedelta
+from unittest.mock import patch
+import json
+import re
+from booking.models import (
+    Booking, PricingRule, PricingConfig, AvailabilityConfig, OwnerProfile, User, get_default_property_id,
+)
+from booking.holds import place_hold, sweep_expired_holds
+from booking.utils import calculate_total_price, are_dates_available, get_occupancy_map
+
+"""
+Query plan regression suite:
+- Runs each hot path in views.py / utils.py while capturing its SQL
+- Asks SQLite for the EXPLAIN QUERY PLAN of every SELECT
+- Fails if any of them reads a table with a full scan instead of an index
+"""
+
+# The default property is the first row in rowid order (LIMIT 1, and cached).
+# Config and rule tables are now read by their property_id index.
+# "subquery" is the LIMITed inner query of a capped admin count.
+SCAN_ALLOWED = {'booking_property', 'subquery'}
+FULL_SCAN = re.compile(r'^SCAN (\w+)$')
+
+
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = date.today()
+        PricingConfig.objects.create(base_rate=100)
+        AvailabilityConfig.objects.create(months_ahead=3)
+        for offset in range(0, 90, 3):
+            PricingRule.objects.create(date=cls.today + timedelta(days=offset), rate=150)
+        for offset in range(0, 90, 5):
+            Booking.objects.create(
+                name='Guest', email='guest@test.com',
+                check_in=cls.today + timedelta(days=offset),
+                check_out=cls.today + timedelta(days=offset + 2),
+                paid=offset % 10 == 0,
+            )
+        cls.owner = User.objects.create_user(username='owner', password='secret')
+        OwnerProfile.objects.create(user=cls.owner, name='Owner')
+
+    def setUp(self):
+        cache.clear()
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertNoFullScans(self, func):
+        """Runs func, then checks the plan of every SELECT it issued."""
+        with CaptureQueriesContext(connection) as ctx:
+            func()
+        selects = [q['sql'] for q in ctx.captured_queries if q['sql'].lstrip().upper().startswith('SELECT')]
+        self.assertTrue(selects, 'Hot path issued no queries to check')
+        for sql in selects:
+            for detail in self.explain(sql):
+                match = FULL_SCAN.match(detail)
+                if match and match.group(1) not in SCAN_ALLOWED:
+                    self.fail(f"Full table scan ({detail}) in:\n{sql}")
+
+    def test_total_price_uses_index(self):
+        self.assertNoFullScans(lambda: calculate_total_price(self.today, self.today + timedelta(days=30)))
+
+    def test_date_availability_uses_index(self):
+        self.assertNoFullScans(lambda: are_dates_available(self.today, self.today + timedelta(days=7)))
+
+    def test_hold_sweep_uses_index(self):
+        self.assertNoFullScans(sweep_expired_holds)
+
+    def test_occupancy_map_uses_index(self):
+        self.assertNoFullScans(lambda: get_occupancy_map(self.today, self.today + timedelta(days=60)))
+
+    def test_availability_json_uses_indexes(self):
+        self.assertNoFullScans(lambda: self.client.get(reverse('availability_json')))
+
+    def test_owner_calendar_data_uses_indexes(self):
+        self.client.force_login(self.owner)
+        self.assertNoFullScans(lambda: self.client.get(reverse('calendar_data')))
+
+    def test_owner_dashboard_uses_indexes(self):
+        self.client.force_login(self.owner)
+        self.assertNoFullScans(lambda: self.client.get(reverse('owner_dashboard')))
+
+    def test_admin_email_search_uses_index(self):
+        self.client.force_login(User.objects.create_superuser(username='admin', password='secret'))
+        self.assertNoFullScans(
+            lambda: self.client.get(reverse('admin:booking_booking_changelist'), {'q': 'guest@test.com'})
+        )
+
+    def test_admin_paid_filter_uses_index(self):
+        self.client.force_login(User.objects.create_superuser(username='admin', password='secret'))
+        self.assertNoFullScans(
+            lambda: self.client.get(reverse('admin:booking_booking_changelist'), {'paid__exact': '0'})
+        )
+
+    def test_admin_date_drill_down_uses_index(self):
+        self.client.force_login(User.objects.create_superuser(username='admin', password='secret'))
+        self.assertNoFullScans(lambda: self.client.get(reverse('admin:booking_booking_changelist'), {
+            'check_in__year': self.today.year, 'check_in__month': self.today.month,
+        }))
+
+    @patch('booking.views.stripe.checkout.Session.create')
+    def test_book_view_uses_indexes(self, mock_stripe_session_create):
+        mock_stripe_session_create.return_value.url = 'https://checkout.stripe.com/test_session'
+        self.assertNoFullScans(lambda: self.client.post(reverse('book'), {
+            'name': 'Alice',
+            'email': 'alice@example.com',
+            'check_in': self.today + timedelta(days=1),
+            'check_out': self.today + timedelta(days=3),
+        }))
+
+    @patch('booking.views.stripe.Webhook.construct_event')
+    def test_stripe_webhook_uses_indexes(self, mock_construct_event):
+        check_in = self.today + timedelta(days=91)  # Clear of the seeded stays
+        hold = place_hold(get_default_property_id(), check_in, check_in + timedelta(days=2))
+        mock_construct_event.return_value = {
+            'id': 'evt_plan',
+            'type': 'checkout.session.completed',
+            'data': {'object': {'metadata': {
+                'name': 'Guest', 'email': 'guest@test.com', 'total_price': 200, 'hold_id': str(hold.pk),
+                'check_in': check_in.isoformat(), 'check_out': (check_in + timedelta(days=2)).isoformat(),
+            }}},
+        }
+
+        def deliver():
+            # The second delivery is acknowledged from the ledger
+            for _ in range(2):
+                response = self.client.post(reverse('stripe-webhook'), data='{}', content_type='application/json',
+                                            HTTP_STRIPE_SIGNATURE='sig')
+                self.assertEqual(response.status_code, 200)
+        self.assertNoFullScans(deliver)
+
+    def test_update_prices_uses_indexes(self):
+        self.client.force_login(self.owner)
+        self.assertNoFullScans(lambda: self.client.post(reverse('update_prices'), data=json.dumps({
+            'start': self.today.isoformat(), 'end': (self.today + timedelta(days=30)).isoformat(), 'price': '140',
+        }), content_type='application/json'))
@@ -1,7 +1,11 @@
+from django.core.cache import cache
 from django.test import TestCase
 from datetime import date, timedelta
-from booking.models import PricingRule, PricingConfig
-from booking.utils import calculate_total_price, DEFAULT_BASE_RATE  # Import the fallback rate constant
+from booking.models import PricingRule, PricingConfig, AvailabilityConfig
+from booking.utils import (
+    calculate_total_price, get_nightly_prices, iter_free_nights, get_base_rate, get_data_version, get_max_bookable_date,
+    get_site_config, DEFAULT_BASE_RATE, SITE_CONFIG_CACHE_KEY,  # Import the fallback rate constant
+)
 
 class CalculateTotalPriceTest(TestCase):
     def setUp(self):
@@ -51,4 +55,110 @@ class CalculateTotalPriceTest(TestCase):
         total = calculate_total_price(check_in, check_out)
         expected_total = 2 * DEFAULT_BASE_RATE  # Use the constant, not hardcoded value
 
-        self.assertEqual(total, expected_total)
\ No newline at end of file
+        self.assertEqual(total, expected_total)
+
+
+class NightlyPricesQueryCountTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        PricingConfig.objects.create(base_rate=150)
+        self.check_in = date.today() + timedelta(days=1)
+        for offset in range(0, 30, 3):
+            PricingRule.objects.create(date=self.check_in + timedelta(days=offset), rate=200)
+
+    def test_breakdown_lists_every_night(self):
+        """
+        The breakdown should contain one (date, price) entry per night,
+        using overrides where present and the base rate otherwise.
+        """
+        nights = get_nightly_prices(self.check_in, self.check_in + timedelta(days=4))
+
+        self.assertEqual([d for d, _ in nights], [self.check_in + timedelta(days=i) for i in range(4)])
+        self.assertEqual([price for _, price in nights], [200, 150, 150, 200])
+
+    def test_query_count_is_constant(self):
+        """
+        Quoting a single night or a whole month should cost the same
+        number of queries: only the data version check once the
+        compiled price vector is warm.
+        """
+        calculate_total_price(self.check_in, self.check_in + timedelta(days=1))
+        for nights in (1, 7, 30):
+            with self.assertNumQueries(1):
+                calculate_total_price(self.check_in, self.check_in + timedelta(days=nights))
+
+    def test_empty_stay_runs_no_queries(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(get_nightly_prices(self.check_in, self.check_in), [])
+
+
+class SiteConfigCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_steady_state_runs_no_config_queries(self):
+        PricingConfig.objects.create(base_rate=130)
+        AvailabilityConfig.objects.create(months_ahead=6)
+        get_site_config()
+
+        with self.assertNumQueries(1):  # Data version
+            self.assertEqual(get_base_rate(), 130)
+        data_version = get_data_version()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_base_rate(data_version=data_version), 130)
+            self.assertEqual(get_max_bookable_date(data_version=data_version), date.today() + timedelta(days=180))
+
+    def test_save_invalidates_cached_rate(self):
+        config = PricingConfig.objects.create(base_rate=130)
+        self.assertEqual(get_base_rate(), 130)
+
+        config.base_rate = 175
+        config.save()
+        self.assertEqual(get_base_rate(), 175)
+
+    def test_save_in_another_process_reloads_the_config(self):
+        config = PricingConfig.objects.create(base_rate=130)
+        self.assertEqual(get_base_rate(), 130)
+        # This process never sees the other worker's invalidation
+        stale = cache.get(SITE_CONFIG_CACHE_KEY.format(config.property_id))
+
+        config.base_rate = 175
+        config.save()
+        cache.set(SITE_CONFIG_CACHE_KEY.format(config.property_id), stale, None)
+
+        self.assertEqual(get_base_rate(), 175)
+
+    def test_delete_falls_back_to_defaults(self):
+        PricingConfig.objects.create(base_rate=130)
+        AvailabilityConfig.objects.create(months_ahead=6)
+        get_site_config()
+
+        PricingConfig.objects.all().delete()
+        AvailabilityConfig.objects.all().delete()
+
+        config = get_site_config()
+        self.assertIsNone(config.configured_base_rate)
+        self.assertEqual(config.base_rate, DEFAULT_BASE_RATE)
+        self.assertEqual(get_max_bookable_date(), date.today() + timedelta(days=90))
+
+
+class IterFreeNightsTest(TestCase):
+    def test_sweep_skips_overlapping_ranges(self):
+        """
+        Overlapping and touching ranges are merged by the sweep; check-out
+        days are free again.
+        """
+        start = date(2025, 6, 1)
+        booked = [
+            (date(2025, 5, 30), date(2025, 6, 2)),
+            (date(2025, 6, 4), date(2025, 6, 7)),
+            (date(2025, 6, 5), date(2025, 6, 6)),
+            (date(2025, 6, 7), date(2025, 6, 8)),
+        ]
+
+        free = list(iter_free_nights(start, start + timedelta(days=10), booked))
+
+        self.assertEqual(free, [
+            date(2025, 6, 2), date(2025, 6, 3),
+            date(2025, 6, 8), date(2025, 6, 9), date(2025, 6, 10),
+        ])
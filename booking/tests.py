@@ -10,16 +10,39 @@ Covers:
 - Business rules (past dates, overlapping bookings)
 """
 
+from .admin import BookingAdmin
 from .forms import BookingForm
-from .models import Booking, PricingConfig, PricingRule, AvailabilityConfig
-from .utils import calculate_total_price, get_max_bookable_date
+from .instrumentation import ServerTimingMiddleware
+from .snapshots import KIND_PUBLIC, SNAPSHOT_CACHE_KEY, get_month_versions
+from .outbox import OUTBOX_MAX_ATTEMPTS, claim_outbox, deliver_outbox
+from .models import (
+    Booking, BookingHold, Collaborator, EmailOutbox, NightOccupancy, PricingConfig, PricingRule, AvailabilityConfig,
+    OwnerProfile, ProcessedStripeEvent, Property, User, get_default_property_id,
+)
+from .views import DASHBOARD_PAGE_SIZE
+from .utils import (
+    ROLE_CACHE_KEY, ROLE_COLLABORATOR, Role, bulk_set_prices, calculate_total_price, get_data_version,
+    get_max_bookable_date, get_user_role,
+)
+from asgiref.sync import iscoroutinefunction
 from datetime import date, timedelta
 from django.core import mail
-from django.test import TestCase, Client
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.mail import get_connection
+from django.core.exceptions import ValidationError
+from django.core.handlers.base import BaseHandler
+from django.db import IntegrityError, connection
+from django.test import AsyncClient, TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
+from io import StringIO
 import json
-from unittest.mock import patch
+import stripe
+import threading
+import time
+from unittest.mock import Mock, patch
 
 
 
@@ -69,6 +92,50 @@ class BookingFormSubmissionTest(TestCase):
         self.assertIn('stripe.com', response['Location'])
         self.assertEqual(Booking.objects.count(), 0)  # No booking yet until webhook
 
+    @patch('booking.views.stripe.checkout.Session.create')
+    def test_stripe_timeout_shows_retry_page(self, mock_stripe_session_create):
+        """A Stripe timeout should answer 503 with a retry page, not an error."""
+        mock_stripe_session_create.side_effect = stripe.error.APIConnectionError("Read timed out")
+
+        response = self.client.post(self.url, self.valid_data)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertTemplateUsed(response, 'booking/retry.html')
+        self.assertIn('Retry-After', response)
+        self.assertContains(response, 'value="alice@example.com"', status_code=503)
+
+    @override_settings(STRIPE_CONNECT_TIMEOUT=0.05, STRIPE_READ_TIMEOUT=0.05)
+    @patch('booking.views.stripe.checkout.Session.create')
+    def test_slow_call_is_not_abandoned(self, mock_stripe_session_create):
+        """A call still running is waited for on the Stripe pool, never cut off while it can create a session."""
+        threads = []
+
+        def slow_create(**kwargs):
+            threads.append(threading.current_thread().name)
+            time.sleep(0.3)
+            session = Mock()
+            session.url = 'https://checkout.stripe.com/test_session'
+            return session
+        mock_stripe_session_create.side_effect = slow_create
+
+        response = self.client.post(self.url, self.valid_data)
+
+        self.assertEqual(response.status_code, 303)
+        self.assertTrue(threads[0].startswith('stripe'))
+        self.assertTrue(BookingHold.objects.exists())  # Still held for the session the guest got
+
+    @patch('booking.checkout._in_flight', threading.BoundedSemaphore(1))
+    @patch('booking.views.stripe.checkout.Session.create')
+    def test_concurrency_limit_sheds_load(self, mock_stripe_session_create):
+        """Once the in-flight limit is reached, new submissions get the retry page without calling Stripe."""
+        from booking import checkout
+        checkout._in_flight.acquire()  # Simulate a call already in flight
+
+        response = self.client.post(self.url, self.valid_data)
+
+        self.assertEqual(response.status_code, 503)
+        mock_stripe_session_create.assert_not_called()
+
 
 # ----------------------------
 # Test: Form Validation
@@ -123,6 +190,176 @@ class BookingFormValidationTest(TestCase):
         self.assertEqual(Booking.objects.count(), 1)  # Only original
 
 
+# ----------------------------
+# Test: Price Quotes
+# ----------------------------
+class QuoteViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        PricingConfig.objects.create(base_rate=100)
+        self.check_in = date.today() + timedelta(days=5)
+        self.check_out = self.check_in + timedelta(days=3)
+        PricingRule.objects.create(date=self.check_in + timedelta(days=1), rate=250)
+        self.params = {'check_in': self.check_in.isoformat(), 'check_out': self.check_out.isoformat()}
+
+    def book(self, token):
+        return self.client.post(reverse('book'), {
+            'name': 'Alice', 'email': 'alice@example.com',
+            'check_in': self.check_in, 'check_out': self.check_out, 'quote': token,
+        })
+
+    def test_quote_breaks_down_the_stay(self):
+        quote = self.client.get(reverse('quote'), self.params).json()
+
+        self.assertTrue(quote['available'])
+        self.assertEqual([night['price'] for night in quote['nights']], ['100.00', '250.00', '100.00'])
+        self.assertEqual(quote['total'], '450.00')
+        self.assertIn('token', quote)
+
+    def test_repeated_quote_is_served_from_the_cache(self):
+        self.client.get(reverse('quote'), self.params)
+        with self.assertNumQueries(1):  # Data version
+            self.client.get(reverse('quote'), self.params)
+
+    def test_booked_dates_get_no_token(self):
+        Booking.objects.create(
+            name='Guest', email='guest@test.com', paid=True,
+            check_in=self.check_in + timedelta(days=2), check_out=self.check_out + timedelta(days=2),
+        )
+        quote = self.client.get(reverse('quote'), self.params).json()
+
+        self.assertFalse(quote['available'])
+        self.assertNotIn('token', quote)
+
+    def test_invalid_dates_are_rejected(self):
+        response = self.client.get(reverse('quote'), {'check_in': self.check_out.isoformat(), 'check_out': self.check_in.isoformat()})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('quote'), {'check_in': 'soon'})
+        self.assertEqual(response.status_code, 400)
+
+    @patch('booking.views.stripe.checkout.Session.create')
+    def test_book_view_takes_the_quoted_total(self, mock_stripe_session_create):
+        mock_stripe_session_create.return_value.url = 'https://checkout.stripe.com/test_session'
+        token = self.client.get(reverse('quote'), self.params).json()['token']
+
+        with patch('booking.views.calculate_total_price') as mock_price:
+            response = self.book(token)
+
+        self.assertEqual(response.status_code, 303)
+        mock_price.assert_not_called()
+        self.assertEqual(mock_stripe_session_create.call_args.kwargs['line_items'][0]['price_data']['unit_amount'], 45000)
+
+    @patch('booking.views.stripe.checkout.Session.create')
+    def test_stale_or_forged_tokens_are_priced_again(self, mock_stripe_session_create):
+        mock_stripe_session_create.return_value.url = 'https://checkout.stripe.com/test_session'
+        token = self.client.get(reverse('quote'), self.params).json()['token']
+        PricingRule.objects.create(date=self.check_in, rate=300)  # Moves the data version
+
+        self.assertEqual(self.book(token).status_code, 303)
+        self.assertEqual(mock_stripe_session_create.call_args.kwargs['line_items'][0]['price_data']['unit_amount'], 65000)
+
+        BookingHold.objects.all().delete()  # As if the first checkout was abandoned
+        mock_stripe_session_create.reset_mock()
+        self.assertEqual(self.book(token[:-1] + ('A' if token[-1] != 'A' else 'B')).status_code, 303)
+        self.assertEqual(mock_stripe_session_create.call_args.kwargs['line_items'][0]['price_data']['unit_amount'], 65000)
+
+
+# ----------------------------
+# Test: Checkout Holds
+# ----------------------------
+class BookingHoldTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.check_in = date.today() + timedelta(days=5)
+        self.check_out = self.check_in + timedelta(days=2)
+        self.form = {'name': 'Alice', 'email': 'alice@example.com', 'check_in': self.check_in, 'check_out': self.check_out}
+
+    def hold(self, check_in=None, minutes=30):
+        check_in = check_in or self.check_in
+        return BookingHold.objects.create(
+            check_in=check_in, check_out=check_in + timedelta(days=2),
+            expires_at=timezone.now() + timedelta(minutes=minutes),
+        )
+
+    def webhook(self, mock_construct_event, event_type, metadata):
+        mock_construct_event.return_value = {
+            'id': f'evt_{event_type}', 'type': event_type, 'data': {'object': {'metadata': metadata}},
+        }
+        return self.client.post(reverse('stripe-webhook'), data='{}', content_type='application/json', HTTP_STRIPE_SIGNATURE='sig')
+
+    @patch('booking.views.stripe.checkout.Session.create')
+    def test_checkout_holds_the_dates_for_the_session(self, mock_stripe_session_create):
+        mock_stripe_session_create.return_value.url = 'https://checkout.stripe.com/test_session'
+
+        self.assertEqual(self.client.post(reverse('book'), self.form).status_code, 303)
+        hold = BookingHold.objects.get()
+        kwargs = mock_stripe_session_create.call_args.kwargs
+        self.assertEqual(kwargs['metadata']['hold_id'], hold.pk)
+        self.assertEqual(kwargs['expires_at'], int(hold.expires_at.timestamp()))
+
+        # A second guest is turned away before reaching Stripe
+        response = self.client.post(reverse('book'), {**self.form, 'check_in': self.check_in + timedelta(days=1),
+                                                      'check_out': self.check_out + timedelta(days=1)})
+        self.assertContains(response, 'These dates are already booked.')
+        self.assertEqual(mock_stripe_session_create.call_count, 1)
+
+    @patch('booking.views.stripe.checkout.Session.create')
+    def test_failed_checkout_releases_the_hold(self, mock_stripe_session_create):
+        mock_stripe_session_create.side_effect = stripe.error.APIConnectionError("Read timed out")
+        self.assertEqual(self.client.post(reverse('book'), self.form).status_code, 503)
+        self.assertFalse(BookingHold.objects.exists())
+
+    @patch('booking.views.stripe.checkout.Session.create')
+    def test_expired_holds_do_not_block(self, mock_stripe_session_create):
+        mock_stripe_session_create.return_value.url = 'https://checkout.stripe.com/test_session'
+        self.hold(minutes=-1)
+        self.assertEqual(self.client.post(reverse('book'), self.form).status_code, 303)
+
+    @patch('booking.views.stripe.Webhook.construct_event')
+    def test_payment_turns_the_hold_into_a_booking(self, mock_construct_event):
+        hold = self.hold()
+        response = self.webhook(mock_construct_event, 'checkout.session.completed', {
+            'name': 'Alice', 'email': 'alice@example.com', 'check_in': self.check_in.isoformat(),
+            'check_out': self.check_out.isoformat(), 'total_price': 300, 'hold_id': hold.pk,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(Booking.objects.filter(paid=True).exists())
+        self.assertFalse(BookingHold.objects.exists())
+
+    @patch('booking.views.stripe.Webhook.construct_event')
+    def test_expired_session_releases_the_hold(self, mock_construct_event):
+        hold = self.hold()
+        response = self.webhook(mock_construct_event, 'checkout.session.expired', {'hold_id': str(hold.pk)})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(BookingHold.objects.exists())
+
+    def test_feeds_show_held_nights_as_taken(self):
+        owner = User.objects.create_user(username='owner', password='secret')
+        OwnerProfile.objects.create(user=owner, name='Owner')
+        self.client.get(reverse('availability_json'))  # Cache the month snapshots first
+        self.hold()
+
+        events = self.client.get(reverse('availability_json')).json()
+        self.assertIn(
+            {'title': 'Booked', 'start': self.check_in.isoformat(), 'end': self.check_out.isoformat(), 'color': 'red'},
+            events
+        )
+        self.assertNotIn(self.check_in.isoformat(), [e['start'] for e in events if e['title'] != 'Booked'])
+
+        self.client.force_login(owner)
+        events = self.client.get(reverse('calendar_data'), {'start': self.check_in.isoformat()}).json()
+        self.assertTrue(events[0]['extendedProps']['held'])
+        self.assertNotIn('held', events[2]['extendedProps'])
+
+    def test_sweep_deletes_only_lapsed_holds(self):
+        self.hold(minutes=-5)
+        live = self.hold(check_in=self.check_in + timedelta(days=10))
+        out = StringIO()
+        call_command('sweep_holds', stdout=out)
+        self.assertEqual(list(BookingHold.objects.all()), [live])
+        self.assertIn('Swept 1', out.getvalue())
+
+
 # ----------------------------
 # Test: Stripe Webhook Handling
 # ----------------------------
@@ -177,6 +414,83 @@ class StripeWebhookTest(TestCase):
         self.assertEqual(response.status_code, 400)
 
 
+# ----------------------------
+# Test: Webhook Idempotency Ledger
+# ----------------------------
+class StripeEventLedgerTest(TestCase):
+    def setUp(self):
+        self.check_in = date.today() + timedelta(days=5)
+        self.event = {
+            'id': 'evt_test_123',
+            'type': 'checkout.session.completed',
+            'data': {'object': {'metadata': {
+                'name': 'Ledger Guest',
+                'email': 'ledger@example.com',
+                'check_in': self.check_in.isoformat(),
+                'check_out': (self.check_in + timedelta(days=2)).isoformat(),
+                'total_price': 300,
+            }}},
+        }
+
+    def deliver(self, event):
+        with patch('booking.views.stripe.Webhook.construct_event', return_value=event):
+            return self.client.post(
+                reverse('stripe-webhook'), data=json.dumps({}),
+                content_type='application/json', HTTP_STRIPE_SIGNATURE='fake'
+            )
+
+    def test_processed_event_is_recorded(self):
+        response = self.deliver(self.event)
+
+        self.assertEqual(response.status_code, 200)
+        entry = ProcessedStripeEvent.objects.get(event_id='evt_test_123')
+        self.assertEqual(entry.event_type, 'checkout.session.completed')
+        self.assertEqual(entry.outcome, ProcessedStripeEvent.OUTCOME_PROCESSED)
+
+    def test_duplicate_delivery_is_acknowledged_with_one_query(self):
+        self.deliver(self.event)
+
+        with self.assertNumQueries(1):
+            response = self.deliver(self.event)
+
+        self.assertEqual(response.json(), {'status': 'duplicate'})
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(EmailOutbox.objects.count(), 1)
+
+    def test_conflict_is_recorded_and_retries_acknowledged(self):
+        Booking.objects.create(
+            name='Existing', email='existing@example.com',
+            check_in=self.check_in, check_out=self.check_in + timedelta(days=3), paid=True
+        )
+
+        self.assertEqual(self.deliver(self.event).status_code, 409)
+        self.assertEqual(
+            ProcessedStripeEvent.objects.get(event_id='evt_test_123').outcome,
+            ProcessedStripeEvent.OUTCOME_CONFLICT,
+        )
+        self.assertEqual(self.deliver(self.event).status_code, 200)
+
+    def test_errored_event_is_processed_again_on_retry(self):
+        broken = {**self.event, 'data': {'object': {'metadata': {}}}}
+        self.assertEqual(self.deliver(broken).status_code, 500)
+
+        response = self.deliver(self.event)
+
+        self.assertEqual(response.json(), {'status': 'success'})
+        self.assertEqual(
+            ProcessedStripeEvent.objects.get(event_id='evt_test_123').outcome,
+            ProcessedStripeEvent.OUTCOME_PROCESSED,
+        )
+
+    def test_other_event_types_are_recorded_as_ignored(self):
+        self.deliver({'id': 'evt_test_456', 'type': 'charge.refunded', 'data': {'object': {}}})
+
+        self.assertEqual(
+            ProcessedStripeEvent.objects.get(event_id='evt_test_456').outcome,
+            ProcessedStripeEvent.OUTCOME_IGNORED,
+        )
+
+
 # ----------------------------
 # Test: Email After Successful Payment
 # ----------------------------
@@ -204,19 +518,62 @@ class EmailAfterPaymentTest(TestCase):
             HTTP_STRIPE_SIGNATURE='fake'
         )
 
+        # The webhook only queues the email; the outbox worker sends it
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(EmailOutbox.objects.get().status, EmailOutbox.STATUS_PENDING)
+
+        deliver_outbox()
+
         self.assertEqual(len(mail.outbox), 1)
         self.assertIn('Booking Confirmation', mail.outbox[0].subject)
         self.assertIn('Thanks for your booking', mail.outbox[0].body)
+        self.assertEqual(EmailOutbox.objects.get().status, EmailOutbox.STATUS_SENT)
+
+    def test_batch_reuses_one_connection(self):
+        """A batch of queued emails should go out over a single mail connection."""
+        for i in range(3):
+            EmailOutbox.objects.create(to_email=f'guest{i}@example.com', subject='Hi', body='Body')
+
+        with patch('booking.outbox.get_connection', wraps=get_connection) as mock_get_connection:
+            self.assertEqual(deliver_outbox(), 3)
+
+        mock_get_connection.assert_called_once()
+        self.assertEqual(len(mail.outbox), 3)
+
+
+    def test_worker_killed_mid_batch_sends_nothing_twice(self):
+        for i in range(3):
+            EmailOutbox.objects.create(to_email=f'guest{i}@example.com', subject='Hi', body='Body')
+
+        with patch('booking.outbox.EmailMessage.send', side_effect=[1, KeyboardInterrupt()]):
+            with self.assertRaises(KeyboardInterrupt):
+                deliver_outbox()
+        self.assertEqual(EmailOutbox.objects.filter(status=EmailOutbox.STATUS_SENT).count(), 1)
+
+        # The rest stay claimed until the lease runs out
+        self.assertEqual(deliver_outbox(), 0)
+        EmailOutbox.objects.filter(status=EmailOutbox.STATUS_SENDING).update(next_attempt_at=timezone.now())
+        self.assertEqual(deliver_outbox(), 2)
+        self.assertEqual(EmailOutbox.objects.filter(status=EmailOutbox.STATUS_SENT).count(), 3)
+        self.assertEqual(len(mail.outbox), 2)  # The first message went out before the crash, from the mock
+
+    def test_claimed_messages_are_skipped_by_other_workers(self):
+        EmailOutbox.objects.create(to_email='guest@example.com', subject='Hi', body='Body')
+        claimed, _ = claim_outbox()
+
+        self.assertEqual(len(claimed), 1)
+        self.assertEqual(deliver_outbox(), 0)
+        self.assertEqual(len(mail.outbox), 0)
 
 
 # ----------------------------
 # Test: Email Failure Handling
 # ----------------------------
 class WebhookEmailFailureTest(TestCase):
-    @patch('booking.views.send_mail', side_effect=Exception("SMTP error"))
+    @patch('booking.outbox.EmailMessage.send', side_effect=Exception("SMTP error"))
     @patch('booking.views.stripe.Webhook.construct_event')
-    def test_email_failure_does_not_break_webhook(self, mock_construct_event, mock_send_mail):
-        """If email sending fails, webhook should still succeed and booking should be created."""
+    def test_email_failure_does_not_break_webhook(self, mock_construct_event, mock_send):
+        """If email sending fails, webhook should still succeed and the email should be retried later."""
         metadata = {
             'name': 'Fail Email',
             'email': 'fail@example.com',
@@ -240,6 +597,25 @@ class WebhookEmailFailureTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTrue(Booking.objects.exists())
 
+        deliver_outbox()
+
+        message = EmailOutbox.objects.get()
+        self.assertEqual(message.status, EmailOutbox.STATUS_PENDING)
+        self.assertEqual(message.attempts, 1)
+        self.assertEqual(message.last_error, 'SMTP error')
+        self.assertGreater(message.next_attempt_at, timezone.now())
+
+    @patch('booking.outbox.EmailMessage.send', side_effect=Exception("SMTP error"))
+    def test_email_marked_failed_after_max_attempts(self, mock_send):
+        message = EmailOutbox.objects.create(
+            to_email='fail@example.com', subject='Hi', body='Body', attempts=OUTBOX_MAX_ATTEMPTS - 1
+        )
+
+        deliver_outbox()
+
+        message.refresh_from_db()
+        self.assertEqual(message.status, EmailOutbox.STATUS_FAILED)
+
 
 # ----------------------------
 # Test: Webhook Integration (Invalid Signature)
@@ -266,6 +642,9 @@ class WebhookIntegrationTest(TestCase):
 # Test: Availability Views (Calendar)
 # ----------------------------
 class AvailabilityViewTest(TestCase):
+    def setUp(self):
+        cache.clear()  # Month snapshots outlive the rolled-back rows of earlier tests
+
     def test_availability_html_renders_successfully(self):
         """GET /availability/ should return 200 and render the correct template."""
         response = self.client.get(reverse('availability'))
@@ -296,6 +675,716 @@ class AvailabilityViewTest(TestCase):
 
         # These tests verify both the frontend calendar view and the backend data JSON endpoint.
 
+    def test_availability_json_skips_unpaid_and_booked_nights(self):
+        """Unpaid bookings are ignored; nights of paid bookings get no price event."""
+        today = date.today()
+        Booking.objects.create(
+            name="Paid", email="paid@test.com",
+            check_in=today + timedelta(days=2), check_out=today + timedelta(days=4), paid=True
+        )
+        Booking.objects.create(
+            name="Unpaid", email="unpaid@test.com",
+            check_in=today + timedelta(days=6), check_out=today + timedelta(days=8), paid=False
+        )
+
+        data = self.client.get(reverse('availability_json'), {
+            'start': today.isoformat(),
+            'end': (today + timedelta(days=10)).isoformat(),
+        }).json()
+
+        booked = [e for e in data if e["title"] == "Booked"]
+        free_days = {e["start"] for e in data if e["title"] != "Booked"}
+        self.assertEqual(len(booked), 1)
+        self.assertEqual(len(free_days), 8)
+        self.assertNotIn((today + timedelta(days=2)).isoformat(), free_days)
+        self.assertNotIn((today + timedelta(days=3)).isoformat(), free_days)
+        self.assertIn((today + timedelta(days=6)).isoformat(), free_days)
+
+    def test_availability_json_honours_calendar_range(self):
+        """Only the requested range is returned, whatever the booking history."""
+        today = date.today()
+        Booking.objects.create(
+            name="Outside", email="outside@test.com",
+            check_in=today + timedelta(days=20), check_out=today + timedelta(days=22), paid=True
+        )
+
+        data = self.client.get(reverse('availability_json'), {
+            'start': f"{today.isoformat()}T00:00:00+02:00",
+            'end': f"{(today + timedelta(days=7)).isoformat()}T00:00:00+02:00",
+        }).json()
+
+        self.assertFalse([e for e in data if e["title"] == "Booked"])
+        self.assertEqual(len(data), 7)
+
+    def test_availability_json_query_count_is_independent_of_history(self):
+        today = date.today()
+        for offset in range(0, 60, 3):
+            Booking.objects.create(
+                name="Guest", email="guest@test.com",
+                check_in=today + timedelta(days=offset), check_out=today + timedelta(days=offset + 2), paid=True
+            )
+        self.client.get(reverse('availability_json'))  # Warm the config cache and the month snapshots
+
+        with self.assertNumQueries(2):  # Data version and month versions; the months come from their snapshots
+            self.client.get(reverse('availability_json'))
+
+    def test_a_change_rebuilds_only_its_own_month(self):
+        property_id = get_default_property_id()
+        this_month = date.today().replace(day=1)
+        later = (this_month + timedelta(days=70)).replace(day=1)
+        self.client.get(reverse('availability_json'))  # Cache the month snapshots
+        before = get_month_versions(property_id, [this_month, later])
+
+        Booking.objects.create(
+            name="Paid", email="paid@test.com", check_in=later + timedelta(days=2), check_out=later + timedelta(days=4),
+            paid=True,
+        )
+
+        after = get_month_versions(property_id, [this_month, later])
+        self.assertEqual(after[this_month], before[this_month])
+        self.assertNotEqual(after[later], before[later])
+        self.assertIn(SNAPSHOT_CACHE_KEY.format(KIND_PUBLIC, property_id, after[this_month], this_month), cache)
+
+    def test_new_booking_shows_up_in_a_warm_feed(self):
+        today = date.today()
+        self.client.get(reverse('availability_json'))  # Cache the month snapshots
+        Booking.objects.create(
+            name="Paid", email="paid@test.com",
+            check_in=today + timedelta(days=40), check_out=today + timedelta(days=43), paid=True
+        )
+        data = self.client.get(reverse('availability_json')).json()
+        self.assertIn(
+            {"start": (today + timedelta(days=40)).isoformat(), "end": (today + timedelta(days=43)).isoformat()},
+            [{"start": e["start"], "end": e["end"]} for e in data if e["title"] == "Booked"]
+        )
+
+    def test_change_made_by_another_worker_shows_up_in_a_warm_feed(self):
+        today = date.today()
+        booking = Booking.objects.create(
+            name="Paid", email="paid@test.com",
+            check_in=today + timedelta(days=5), check_out=today + timedelta(days=7), paid=True
+        )
+        self.client.get(reverse('availability_json'))  # Cache the month snapshots
+        # The other worker's signal handlers never touch this process's cache
+        with patch('django.core.cache.cache.delete_many'), patch('django.core.cache.cache.delete'):
+            booking.delete()
+
+        data = self.client.get(reverse('availability_json')).json()
+        self.assertFalse([e for e in data if e["title"] == "Booked"])
+
+    def test_moved_booking_frees_its_old_nights(self):
+        today = date.today()
+        booking = Booking.objects.create(
+            name="Paid", email="paid@test.com",
+            check_in=today + timedelta(days=5), check_out=today + timedelta(days=7), paid=True
+        )
+        self.client.get(reverse('availability_json'))  # Cache the month snapshots
+        booking.check_in = today + timedelta(days=70)
+        booking.check_out = today + timedelta(days=72)
+        booking.save()
+
+        data = self.client.get(reverse('availability_json')).json()
+        booked = [e["start"] for e in data if e["title"] == "Booked"]
+        self.assertEqual(booked, [(today + timedelta(days=70)).isoformat()])
+
+    def test_streamed_feed_matches_the_regular_one(self):
+        today = date.today()
+        Booking.objects.create(
+            name="Paid", email="paid@test.com",
+            check_in=today + timedelta(days=2), check_out=today + timedelta(days=4), paid=True
+        )
+        regular = self.client.get(reverse('availability_json'))
+        streamed = self.client.get(reverse('availability_json'), {'stream': '1'})
+
+        self.assertTrue(streamed.streaming)
+        self.assertEqual(streamed['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(b''.join(streamed.streaming_content)), regular.json())
+
+    def test_compact_format_expands_to_the_same_events(self):
+        """Runs of equal prices plus booked ranges carry exactly the per-day feed."""
+        today = date.today()
+        PricingRule.objects.create(date=today + timedelta(days=5), rate=200)
+        Booking.objects.create(
+            name="Paid", email="paid@test.com",
+            check_in=today + timedelta(days=2), check_out=today + timedelta(days=4), paid=True
+        )
+
+        events = self.client.get(reverse('availability_json')).json()
+        compact = self.client.get(reverse('availability_json'), {'format': 'compact'}).json()
+
+        expanded = [{'title': 'Booked', 'start': check_in, 'end': check_out} for check_in, check_out in compact['booked']]
+        day = date.fromisoformat(compact['start'])
+        for days, price in compact['runs']:
+            for _ in range(days):
+                if price is not None:
+                    expanded.append({'title': f"€{price}", 'start': day.isoformat()})
+                day += timedelta(days=1)
+
+        self.assertEqual(
+            sorted((e['title'], e['start'], e.get('end')) for e in events),
+            sorted((e['title'], e['start'], e.get('end')) for e in expanded),
+        )
+        # Base rate, booked gap, base rate, override, base rate to the end of the window
+        self.assertEqual([price for _, price in compact['runs']][:5], [150, None, 150, '200.00', 150])
+
+
+
+# ----------------------------
+# Test: Conditional GET on Calendar Feeds
+# ----------------------------
+class CalendarConditionalGetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username='owner', password='secret')
+        OwnerProfile.objects.create(user=self.owner, name='Owner')
+
+    def test_availability_json_revalidates_with_304(self):
+        """A matching If-None-Match is answered from the data version alone."""
+        response = self.client.get(reverse('availability_json'))
+        etag = response['ETag']
+        self.assertFalse(etag.startswith('W/'))
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        with self.assertNumQueries(1):
+            revalidated = self.client.get(reverse('availability_json'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_etag_changes_when_data_changes(self):
+        etag = self.client.get(reverse('availability_json'))['ETag']
+
+        Booking.objects.create(
+            name='Guest', email='guest@test.com',
+            check_in=date.today() + timedelta(days=2), check_out=date.today() + timedelta(days=4), paid=True
+        )
+        response = self.client.get(reverse('availability_json'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+        etag = response['ETag']
+        PricingRule.objects.create(date=date.today() + timedelta(days=5), rate=99)
+        response = self.client.get(reverse('availability_json'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_requested_range(self):
+        first = self.client.get(reverse('availability_json'), {'start': '2030-01-01', 'end': '2030-02-01'})
+        second = self.client.get(reverse('availability_json'), {'start': '2030-02-01', 'end': '2030-03-01'})
+        self.assertNotEqual(first['ETag'], second['ETag'])
+
+    def test_owner_calendar_data_revalidates_with_304(self):
+        self.client.force_login(self.owner)
+        response = self.client.get(reverse('calendar_data'))
+        self.assertIn('private', response['Cache-Control'])
+
+        revalidated = self.client.get(reverse('calendar_data'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+
+
+# ----------------------------
+# Test: Server-Timing Instrumentation
+# ----------------------------
+class ServerTimingTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_header_reports_queries_and_render(self):
+        Booking.objects.create(
+            name='Guest', email='guest@test.com',
+            check_in=date.today() + timedelta(days=2), check_out=date.today() + timedelta(days=4), paid=True
+        )
+        response = self.client.get(reverse('availability_json'))
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn('total;dur=', timing)
+
+        page = self.client.get(reverse('availability'))
+        self.assertRegex(page['Server-Timing'], r'render;dur=(?!0\.0)[\d.]+')
+
+    @patch('booking.views.stripe.checkout.Session.create')
+    def test_stripe_time_is_attributed(self, mock_stripe_session_create):
+        mock_stripe_session_create.return_value.url = 'https://checkout.stripe.com/test_session'
+        response = self.client.post(reverse('book'), {
+            'name': 'Alice',
+            'email': 'alice@example.com',
+            'check_in': date.today() + timedelta(days=5),
+            'check_out': date.today() + timedelta(days=7),
+        })
+        self.assertIn('stripe;dur=', response['Server-Timing'])
+        self.assertIn('desc="1 calls"', response['Server-Timing'])
+
+    def test_middleware_chain_stays_async(self):
+        """Under ASGI no middleware is adapted, so async views run on the event loop."""
+        handler = BaseHandler()
+        with self.assertNoLogs('django.request', 'DEBUG'):  # Django logs every adapted middleware
+            handler.load_middleware(is_async=True)
+        self.assertTrue(iscoroutinefunction(ServerTimingMiddleware(handler._get_response_async)))
+
+    async def test_async_requests_get_the_header(self):
+        response = await AsyncClient().get(reverse('book'))
+        self.assertIn('total;dur=', response['Server-Timing'])
+
+    @override_settings(SERVER_TIMING_QUERY_THRESHOLD=0)
+    def test_query_threshold_logs_a_warning(self):
+        with self.assertLogs('booking.timing', 'WARNING') as logs:
+            self.client.get(reverse('availability_json'))
+
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['path'], reverse('availability_json'))
+        self.assertGreater(record['db_queries'], 0)
+        self.assertEqual(record['threshold_exceeded'], ['queries'])
+
+
+# ----------------------------
+# Test: Night Occupancy
+# ----------------------------
+class NightOccupancyTest(TestCase):
+    def setUp(self):
+        self.check_in = date.today() + timedelta(days=5)
+        self.check_out = self.check_in + timedelta(days=3)
+
+    def create_booking(self, check_in, check_out, paid=True):
+        return Booking.objects.create(
+            name='Guest', email='guest@test.com', check_in=check_in, check_out=check_out, paid=paid
+        )
+
+    def test_paid_booking_occupies_each_night(self):
+        booking = self.create_booking(self.check_in, self.check_out)
+        self.assertEqual(
+            list(booking.nights.order_by('date').values_list('date', flat=True)),
+            [self.check_in + timedelta(days=i) for i in range(3)],
+        )
+
+    def test_unpaid_booking_holds_no_nights(self):
+        booking = self.create_booking(self.check_in, self.check_out, paid=False)
+        self.assertFalse(booking.nights.exists())
+
+        booking.paid = True
+        booking.save()
+        self.assertEqual(booking.nights.count(), 3)
+
+    def test_database_rejects_double_booking(self):
+        """A clashing paid booking is rolled back together with its nights."""
+        self.create_booking(self.check_in, self.check_out)
+
+        with self.assertRaises(IntegrityError):
+            self.create_booking(self.check_out - timedelta(days=1), self.check_out + timedelta(days=2))
+
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(NightOccupancy.objects.count(), 3)
+
+    def test_clean_reports_taken_nights(self):
+        self.create_booking(self.check_in, self.check_out)
+        clashing = Booking(
+            name='Other', email='other@test.com',
+            check_in=self.check_in, check_out=self.check_out, paid=True
+        )
+        with self.assertRaises(ValidationError):
+            clashing.clean()
+
+    @patch('booking.views.stripe.Webhook.construct_event')
+    def test_webhook_rejects_overlap_with_conflict(self, mock_construct_event):
+        self.create_booking(self.check_in, self.check_out)
+        mock_construct_event.return_value = {
+            'type': 'checkout.session.completed',
+            'data': {'object': {'metadata': {
+                'name': 'Late Guest',
+                'email': 'late@test.com',
+                'check_in': (self.check_in + timedelta(days=1)).isoformat(),
+                'check_out': (self.check_out + timedelta(days=1)).isoformat(),
+                'total_price': 300,
+            }}},
+        }
+
+        response = self.client.post(
+            reverse('stripe-webhook'), data=json.dumps({}),
+            content_type='application/json', HTTP_STRIPE_SIGNATURE='fake'
+        )
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Booking.objects.count(), 1)
+
+
+# ----------------------------
+# Test: Owner Calendar Data
+# ----------------------------
+class OwnerCalendarDataTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username='owner', password='secret')
+        OwnerProfile.objects.create(user=self.owner, name='Owner')
+        self.client.force_login(self.owner)
+        PricingConfig.objects.create(base_rate=100)
+        self.start = date.today().replace(day=1)
+        self.end = self.start + timedelta(days=35)
+
+    def get_events(self):
+        return self.client.get(reverse('calendar_data'), {
+            'start': self.start.isoformat(),
+            'end': self.end.isoformat(),
+        }).json()
+
+    def test_requires_owner(self):
+        self.client.logout()
+        response = self.client.get(reverse('calendar_data'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_events_cover_requested_range_with_prices_and_bookings(self):
+        """One event per day, with overrides and booking identity in extendedProps."""
+        PricingRule.objects.create(date=self.start + timedelta(days=3), rate=180)
+        booking = Booking.objects.create(
+            name='Guest', email='guest@test.com',
+            check_in=self.start + timedelta(days=5), check_out=self.start + timedelta(days=7), paid=True
+        )
+
+        events = {e['start']: e for e in self.get_events()}
+
+        self.assertEqual(len(events), 35)
+        self.assertEqual(events[(self.start + timedelta(days=3)).isoformat()]['extendedProps']['price'], '180.00')
+        booked = events[(self.start + timedelta(days=6)).isoformat()]['extendedProps']
+        self.assertTrue(booked['booked'])
+        self.assertEqual(booked['booking_id'], booking.id)
+        self.assertEqual(booked['guest_name'], 'Guest')
+        self.assertFalse(events[(self.start + timedelta(days=7)).isoformat()]['extendedProps']['booked'])
+
+    def test_streamed_feed_matches_the_regular_one(self):
+        Booking.objects.create(
+            name='Guest', email='guest@test.com',
+            check_in=self.start + timedelta(days=5), check_out=self.start + timedelta(days=7), paid=True
+        )
+        params = {'start': self.start.isoformat(), 'end': (self.start + timedelta(days=366)).isoformat()}
+        streamed = self.client.get(reverse('calendar_data'), {**params, 'stream': '1'})
+        chunks = list(streamed.streaming_content)
+
+        self.assertGreater(len(chunks), 1)  # Sent in pieces, not as one body
+        self.assertEqual(json.loads(b''.join(chunks)), self.client.get(reverse('calendar_data'), params).json())
+
+    def test_query_count_does_not_grow_with_days(self):
+        for offset in range(0, 30, 4):
+            Booking.objects.create(
+                name='Guest', email='guest@test.com',
+                check_in=self.start + timedelta(days=offset),
+                check_out=self.start + timedelta(days=offset + 2), paid=True
+            )
+        self.get_events()  # Warm the config cache and the month snapshots
+
+        # Session, user, data version and month versions; the role and the months are cached
+        with self.assertNumQueries(4):
+            self.get_events()
+
+
+# ----------------------------
+# Test: Owner Dashboard Pagination
+# ----------------------------
+class OwnerDashboardTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username='owner', password='secret')
+        OwnerProfile.objects.create(user=self.owner, name='Owner')
+        self.client.force_login(self.owner)
+        self.today = date.today()
+
+    def add_bookings(self, count, start_offset=1, **kwargs):
+        # Two unpaid stays share each check-in, so pages split on the id
+        return Booking.objects.bulk_create([
+            Booking(
+                name=f'Guest {i}', email='guest@test.com', total_price=100,
+                check_in=self.today + timedelta(days=start_offset + i // 2),
+                check_out=self.today + timedelta(days=start_offset + i // 2 + 2),
+                **kwargs
+            )
+            for i in range(count)
+        ])
+
+    def page(self, **params):
+        return self.client.get(reverse('owner_dashboard'), {'format': 'json', **params}).json()
+
+    def test_load_more_walks_every_booking_once(self):
+        self.add_bookings(DASHBOARD_PAGE_SIZE * 2 + 5)
+        seen = []
+        data = self.page()
+        seen += data['bookings']
+        while data['next']:
+            data = self.page(after=data['next'])
+            seen += data['bookings']
+
+        self.assertEqual(len(seen), DASHBOARD_PAGE_SIZE * 2 + 5)
+        self.assertEqual(
+            [(b['check_in'], b['id']) for b in seen],
+            sorted((b.check_in.isoformat(), b.pk) for b in Booking.objects.all())
+        )
+
+    def test_first_page_is_rendered_with_a_cursor(self):
+        self.add_bookings(DASHBOARD_PAGE_SIZE + 1)
+        response = self.client.get(reverse('owner_dashboard'))
+        self.assertEqual(len(response.context['bookings']), DASHBOARD_PAGE_SIZE)
+        self.assertContains(response, f'data-next="{response.context["next_cursor"]}"')
+
+    def test_filters(self):
+        self.add_bookings(4)
+        Booking.objects.create(
+            name='Paid', email='paid@test.com', paid=True,
+            check_in=self.today + timedelta(days=40), check_out=self.today + timedelta(days=42),
+        )
+        Booking.objects.create(
+            name='Past', email='past@test.com',
+            check_in=date(2020, 3, 10), check_out=date(2020, 3, 12),
+        )
+
+        self.assertEqual([b['name'] for b in self.page(paid='1')['bookings']], ['Paid'])
+        self.assertEqual(len(self.page(paid='0')['bookings']), 4)
+        self.assertEqual([b['name'] for b in self.page(month='2020-03')['bookings']], ['Past'])
+        self.assertEqual(len(self.page(month='bogus', after='bogus')['bookings']), 5)  # Ignored
+
+    def test_query_count_does_not_grow_with_history(self):
+        self.add_bookings(DASHBOARD_PAGE_SIZE)
+        self.add_bookings(200, start_offset=-1000)  # Past stays
+        self.client.get(reverse('owner_dashboard'))  # Warm the caches
+
+        with self.assertNumQueries(4):  # Session, user, data version (base rate), one page of bookings
+            response = self.client.get(reverse('owner_dashboard'))
+        self.assertEqual(len(response.context['bookings']), DASHBOARD_PAGE_SIZE)
+
+
+# ----------------------------
+# Test: Admin for Large Tables
+# ----------------------------
+class LargeTableAdminTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        admin_user = User.objects.create_superuser(username='admin', password='secret', email='admin@test.com')
+        self.client.force_login(admin_user)
+        self.today = date.today()
+        self.bookings = [
+            Booking.objects.create(
+                name=f'Guest {i}', email=f'guest{i}@test.com',
+                check_in=self.today + timedelta(days=10 + 3 * i), check_out=self.today + timedelta(days=12 + 3 * i),
+            )
+            for i in range(3)
+        ]
+
+    def act(self, model, action, objects):
+        return self.client.post(reverse(f'admin:booking_{model}_changelist'), {
+            'action': action, '_selected_action': [obj.pk for obj in objects],
+        }, follow=True)
+
+    def test_changelist_skips_the_full_count(self):
+        url = reverse('admin:booking_booking_changelist')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, {'paid__exact': '0'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Guest 2')
+        counts = [q['sql'] for q in ctx.captured_queries if 'COUNT(' in q['sql']]
+        self.assertTrue(counts)
+        self.assertTrue(all('LIMIT' in sql for sql in counts), counts)  # Capped, never the whole table
+
+        self.assertEqual(self.client.get(url, {'q': 'guest1@test.com'}).context['cl'].result_list[0], self.bookings[1])
+
+    def test_paid_filter(self):
+        url = reverse('admin:booking_booking_changelist')
+        Booking.objects.filter(pk=self.bookings[1].pk).update(paid=True)
+        self.assertEqual(list(self.client.get(url, {'paid__exact': '1'}).context['cl'].result_list), [self.bookings[1]])
+        self.assertEqual(
+            list(self.client.get(url, {'paid__exact': '0'}).context['cl'].result_list), [self.bookings[2], self.bookings[0]]
+        )
+
+    def test_count_stops_at_the_last_row_after_deletes(self):
+        Booking.objects.filter(pk__in=[self.bookings[0].pk, self.bookings[1].pk]).delete()  # Highest id stays
+        with patch.object(BookingAdmin, 'list_per_page', 1):
+            response = self.client.get(reverse('admin:booking_booking_changelist'))
+        self.assertEqual(response.context['cl'].result_count, 1)
+        self.assertEqual(response.context['cl'].paginator.num_pages, 1)
+
+    def test_mark_paid_books_the_nights_and_refreshes_the_feed(self):
+        self.client.get(reverse('availability_json'))  # Cache the month snapshots
+        version = get_data_version()[0]
+
+        self.act('booking', 'mark_paid', self.bookings[:2])
+
+        self.assertEqual(Booking.objects.filter(paid=True).count(), 2)
+        self.assertEqual(NightOccupancy.objects.count(), 4)
+        self.assertGreater(get_data_version()[0], version)
+        booked = [e['start'] for e in self.client.get(reverse('availability_json')).json() if e['title'] == 'Booked']
+        self.assertEqual(booked, [b.check_in.isoformat() for b in self.bookings[:2]])
+
+    def test_mark_paid_changes_nothing_on_a_clash(self):
+        Booking.objects.create(
+            name='Paid', email='paid@test.com', paid=True,
+            check_in=self.bookings[0].check_in, check_out=self.bookings[0].check_out,
+        )
+        response = self.act('booking', 'mark_paid', self.bookings)
+        self.assertContains(response, 'nothing was changed')
+        self.assertEqual(Booking.objects.filter(paid=True).count(), 1)
+
+    def test_reprice_skips_paid_and_past_bookings(self):
+        self.bookings[1].paid = True
+        self.bookings[1].save()
+        past = Booking.objects.create(
+            name='Past', email='past@test.com',
+            check_in=self.today - timedelta(days=5), check_out=self.today - timedelta(days=3),
+        )
+        Booking.objects.update(total_price=1)
+
+        response = self.act('booking', 'reprice', self.bookings + [past])
+
+        self.assertEqual(
+            set(Booking.objects.filter(total_price=1).values_list('pk', flat=True)), {self.bookings[1].pk, past.pk}
+        )
+        self.assertContains(response, 'Skipped 2 paid or past booking(s).')
+
+    @patch('booking.admin.ESTIMATED_COUNT_CAP', 1)
+    def test_filtered_list_pages_past_the_cap(self):
+        url = reverse('admin:booking_booking_changelist')
+        with patch.object(BookingAdmin, 'list_per_page', 1):
+            first = self.client.get(url, {'paid__exact': '0'})
+            self.assertContains(first, '2+ bookings')  # Page 1 plus the cap, and more beyond
+            last = self.client.get(url, {'paid__exact': '0', 'p': 3})
+
+        self.assertEqual(last.status_code, 200)
+        self.assertEqual(list(last.context['cl'].result_list), [self.bookings[0]])  # Default -pk order
+
+    def test_delete_past_rules_in_one_statement(self):
+        past = [PricingRule.objects.create(date=self.today - timedelta(days=d), rate=90) for d in range(1, 201)]
+        upcoming = PricingRule.objects.create(date=self.today + timedelta(days=1), rate=90)
+        version = get_data_version()[0]
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.act('pricingrule', 'delete_past_rules', past + [upcoming])
+        writes = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith(('DELETE', 'UPDATE'))]
+        self.assertEqual(len([sql for sql in writes if sql.startswith('DELETE')]), 1)
+        self.assertEqual(len([sql for sql in writes if 'booking_dataversion' in sql]), 1)
+        self.assertEqual(list(PricingRule.objects.all()), [upcoming])
+        self.assertEqual(get_data_version()[0], version + 1)
+
+
+# ----------------------------
+# Test: Owner Role Cache
+# ----------------------------
+class OwnerRoleCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        owner = User.objects.create_user(username='owner', password='secret')
+        self.profile = OwnerProfile.objects.create(user=owner, name='Owner')
+        self.user = User.objects.create_user(username='helper', password='secret')
+        self.collaborator = Collaborator.objects.create(owner=self.profile, user=self.user)
+        self.client.force_login(self.user)
+
+    def test_role_is_resolved_once(self):
+        self.assertEqual(get_user_role(self.user), Role(ROLE_COLLABORATOR, self.profile.pk))
+        with self.assertNumQueries(0):
+            get_user_role(self.user)
+
+    def test_removing_a_collaborator_revokes_access(self):
+        self.assertEqual(self.client.get(reverse('calendar_data')).status_code, 200)
+        self.collaborator.delete()
+        self.assertEqual(self.client.get(reverse('calendar_data')).status_code, 302)
+
+    def test_revocation_through_another_worker_reaches_this_one(self):
+        self.assertEqual(self.client.get(reverse('calendar_data')).status_code, 200)
+        # Another process deletes the collaborator; this one never sees
+        # the invalidation and keeps its cached role
+        stale = cache.get(ROLE_CACHE_KEY.format(self.user.pk))
+        self.collaborator.delete()
+        cache.set(ROLE_CACHE_KEY.format(self.user.pk), stale, None)
+
+        self.assertEqual(self.client.get(reverse('calendar_data')).status_code, 302)
+
+    def test_saving_a_stale_user_keeps_the_role_version(self):
+        stale_user = User.objects.get(pk=self.user.pk)
+        self.collaborator.delete()
+        stale_user.first_name = 'Helper'
+        stale_user.save()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, 'Helper')
+        self.assertGreater(self.user.role_version, stale_user.role_version)
+
+    def test_new_owner_profile_grants_access(self):
+        stranger = User.objects.create_user(username='stranger', password='secret')
+        self.client.force_login(stranger)
+        self.assertEqual(self.client.get(reverse('calendar_data')).status_code, 302)
+        OwnerProfile.objects.create(user=stranger, name='Stranger')
+        self.assertEqual(self.client.get(reverse('calendar_data')).status_code, 200)
+
+
+# ----------------------------
+# Test: Multiple Properties
+# ----------------------------
+class MultiPropertyTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.default = Property.objects.get(pk=get_default_property_id())
+        self.owner = User.objects.create_user(username='owner', password='secret')
+        profile = OwnerProfile.objects.create(user=self.owner, name='Owner')
+        self.other = Property.objects.create(name='Trastevere Loft', slug='trastevere', owner=profile)
+        PricingConfig.objects.create(base_rate=100)
+        PricingConfig.objects.create(property=self.other, base_rate=200)
+        self.check_in = date.today() + timedelta(days=10)
+        self.check_out = self.check_in + timedelta(days=2)
+
+    def scoped(self, name):
+        return reverse(f'property:{name}', kwargs={'property_slug': self.other.slug})
+
+    def test_same_nights_can_be_booked_in_each_property(self):
+        Booking.objects.create(name='A', email='a@test.com', check_in=self.check_in, check_out=self.check_out, paid=True)
+        booking = Booking.objects.create(
+            property=self.other, name='B', email='b@test.com',
+            check_in=self.check_in, check_out=self.check_out, paid=True
+        )
+        self.assertEqual(booking.total_price, 400)
+        self.assertEqual(NightOccupancy.objects.filter(property=self.other).count(), 2)
+
+    def test_feeds_only_show_their_own_property(self):
+        Booking.objects.create(
+            property=self.other, name='B', email='b@test.com',
+            check_in=self.check_in, check_out=self.check_out, paid=True
+        )
+        default_events = self.client.get(reverse('availability_json')).json()
+        scoped_events = self.client.get(self.scoped('availability_json')).json()
+
+        self.assertFalse(any(e['title'] == 'Booked' for e in default_events))
+        self.assertTrue(any(e['title'] == 'Booked' for e in scoped_events))
+        self.assertIn('€200.00', {e['title'] for e in scoped_events})
+        self.assertNotIn('€200.00', {e['title'] for e in default_events})
+
+    def test_changes_in_one_property_keep_the_other_etag(self):
+        etag = self.client.get(reverse('availability_json'))['ETag']
+        bulk_set_prices([self.check_in], 300, self.other.pk)
+        response = self.client.get(reverse('availability_json'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_owner_views_are_limited_to_the_owners_properties(self):
+        stranger = User.objects.create_user(username='stranger', password='secret')
+        OwnerProfile.objects.create(user=stranger, name='Stranger')
+        self.client.force_login(stranger)
+        self.assertEqual(self.client.get(self.scoped('calendar_data')).status_code, 302)
+
+        self.client.force_login(self.owner)
+        response = self.client.post(
+            self.scoped('update_prices'),
+            data=json.dumps({'dates': [self.check_in.isoformat()], 'price': '250'}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(PricingRule.objects.get(date=self.check_in).property, self.other)
+
+    def test_unknown_property_is_404(self):
+        response = self.client.get(reverse('property:availability_json', kwargs={'property_slug': 'nowhere'}))
+        self.assertEqual(response.status_code, 404)
+
+    @patch('booking.views.stripe.Webhook.construct_event')
+    def test_webhook_books_the_property_from_the_metadata(self, mock_construct_event):
+        mock_construct_event.return_value = {
+            'id': 'evt_property',
+            'type': 'checkout.session.completed',
+            'data': {'object': {'metadata': {
+                'property_id': str(self.other.pk),
+                'name': 'B', 'email': 'b@test.com',
+                'check_in': self.check_in.isoformat(), 'check_out': self.check_out.isoformat(),
+            }}},
+        }
+        response = self.client.post(reverse('stripe-webhook'), data='{}', content_type='application/json',
+                                    HTTP_STRIPE_SIGNATURE='fake')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Booking.objects.get().property, self.other)
 
 
 # ----------------------------
@@ -1,59 +1,401 @@
-from .models import PricingRule, PricingConfig, AvailabilityConfig
+from .models import (
+    BookingHold, Collaborator, DataVersion, NightOccupancy, OwnerProfile, PricingRule, PricingConfig, AvailabilityConfig,
+    Property, User,
+    DEFAULT_PROPERTY_CACHE_KEY, get_default_property_id,
+)
+from collections import defaultdict
+from dataclasses import dataclass
 from datetime import date, timedelta
+from decimal import Decimal
+from typing import Optional
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import F
+from django.db.models.functions import TruncMonth
+from django.urls import reverse
+from django.utils import timezone
 
 DEFAULT_BASE_RATE = 150  # Fallback if no PricingConfig is set
 DEFAULT_BOOKING_WINDOW_MONTHS = 3  # fallback if not configured
+SITE_CONFIG_CACHE_KEY = 'booking:site-config:{}'  # Formatted with the property id
+PROPERTY_CACHE_KEY = 'booking:property:{}'  # Formatted with the slug, '' for the default property
+ROLE_CACHE_KEY = 'booking:role:{}'  # Formatted with the user id
+HOLDS_CACHE_KEY = 'booking:holds:{}'  # Formatted with the property id
+ROLE_OWNER = 'owner'
+ROLE_COLLABORATOR = 'collaborator'
 
 
-def calculate_total_price(check_in, check_out):
-    current_date = check_in
-    total = 0
-    try:
-        base_rate = PricingConfig.objects.first().base_rate
-    except AttributeError:
-        base_rate = DEFAULT_BASE_RATE  # Fallback default
+@dataclass(frozen=True)
+class SiteConfig:
+    """
+    Snapshot of a property's PricingConfig and AvailabilityConfig.
+    The configured_* fields are None when the row does not exist.
+    """
+    configured_base_rate: Optional[Decimal] = None
+    configured_months_ahead: Optional[int] = None
+
+    @property
+    def base_rate(self):
+        if self.configured_base_rate is None:
+            return DEFAULT_BASE_RATE
+        return self.configured_base_rate
+
+    @property
+    def months_ahead(self):
+        if self.configured_months_ahead is None:
+            return DEFAULT_BOOKING_WINDOW_MONTHS
+        return self.configured_months_ahead
+
+
+@dataclass(frozen=True)
+class Role:
+    """
+    What a user may do on the owner pages. kind is ROLE_OWNER,
+    ROLE_COLLABORATOR or None (neither); owner_profile_id is the
+    OwnerProfile they own or work for.
+    """
+    kind: Optional[str] = None
+    owner_profile_id: Optional[int] = None
+
+    def can_manage(self, prop=None):
+        # Properties without an owner are open to every owner and collaborator
+        if self.kind is None:
+            return False
+        return prop is None or prop.owner_id is None or prop.owner_id == self.owner_profile_id
 
-    while current_date < check_out:
-        rule = PricingRule.objects.filter(date=current_date).first()
-        if rule:
-            total += rule.rate
+
+def get_user_role(user) -> Role:
+    """
+    Returns the cached Role of a user, resolving it on a miss. Each
+    process has its own cache, so the entry carries the user's
+    role_version, which booking.signals moves whenever their OwnerProfile
+    or Collaborator row changes: a role revoked through another worker is
+    resolved again on the next request. Costs no query on a hit, as the
+    user row is already loaded.
+    """
+    key = ROLE_CACHE_KEY.format(user.pk)
+    cached = cache.get(key)
+    if cached is not None and cached[0] == user.role_version:
+        return cached[1]
+
+    profile_id = OwnerProfile.objects.filter(user=user).values_list('pk', flat=True).first()
+    if profile_id:
+        role = Role(ROLE_OWNER, profile_id)
+    else:
+        owner_id = Collaborator.objects.filter(user=user).values_list('owner_id', flat=True).first()
+        role = Role(ROLE_COLLABORATOR, owner_id) if owner_id else Role()
+    cache.set(key, (user.role_version, role), None)
+    return role
+
+
+def bump_role_version(user_id):
+    """Moves a user's role_version forward, in the caller's transaction."""
+    User.objects.filter(pk=user_id).update(role_version=F('role_version') + 1)
+
+
+def invalidate_user_role(user_id):
+    cache.delete(ROLE_CACHE_KEY.format(user_id))
+
+
+def get_property(slug=None) -> Property:
+    """
+    Returns the property with this slug (the default property when slug is
+    None) from the cache, so resolving the property of a request costs no
+    query. Raises Property.DoesNotExist for unknown slugs.
+    """
+    key = PROPERTY_CACHE_KEY.format(slug or '')
+    prop = cache.get(key)
+    if prop is None:
+        if slug:
+            prop = Property.objects.get(slug=slug)
         else:
-            total += base_rate
-        current_date += timedelta(days=1)
-    return total
+            prop = Property.objects.get(pk=get_default_property_id())
+        cache.set(key, prop, None)
+    return prop
+
+
+def invalidate_property(*slugs):
+    cache.delete_many(
+        [DEFAULT_PROPERTY_CACHE_KEY, PROPERTY_CACHE_KEY.format('')]
+        + [PROPERTY_CACHE_KEY.format(slug) for slug in slugs]
+    )
 
 
-def get_base_rate():
+def property_reverse(request, name):
+    """
+    URL of a per-property view for the property of this request: scoped
+    when the request came in under p/<slug>/, unscoped otherwise.
+    """
+    slug = getattr(request, 'property_slug', None)
+    if slug:
+        return reverse(f'property:{name}', kwargs={'property_slug': slug})
+    return reverse(name)
+
+
+def get_site_config(property_id=None, data_version=None) -> SiteConfig:
+    """
+    Returns the cached SiteConfig of a property (the default one when
+    property_id is None), loading it from the database on a miss. Each
+    process has its own cache, so the entry carries the data version it
+    was loaded under, and a config saved by another worker (which bumps
+    the version) is reloaded on the next read. Pass data_version when the
+    caller already read it.
+    """
+    property_id = property_id or get_default_property_id()
+    # Read before the config: a save landing in between leaves an entry
+    # with the older stamp, which the next read replaces
+    stamp = version_stamp(data_version or get_data_version(property_id))
+    key = SITE_CONFIG_CACHE_KEY.format(property_id)
+    cached = cache.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    pricing = PricingConfig.objects.filter(property_id=property_id).first()
+    availability = AvailabilityConfig.objects.filter(property_id=property_id).first()
+    config = SiteConfig(
+        configured_base_rate=pricing.base_rate if pricing else None,
+        configured_months_ahead=availability.months_ahead if availability else None,
+    )
+    cache.set(key, (stamp, config), None)
+    return config
+
+
+def invalidate_site_config(property_id=None):
+    cache.delete(SITE_CONFIG_CACHE_KEY.format(property_id or get_default_property_id()))
+
+
+def version_stamp(data_version):
+    # updated_at is part of it so a version number reused after a rollback
+    # or a database restore never matches an old entry
+    version, updated_at = data_version
+    return f"{version}.{updated_at.timestamp() if updated_at else 0}"
+
+
+def get_data_version(property_id=None):
+    """
+    Returns (version, updated_at) of a property's calendar data, read with
+    one unique index lookup. (0, None) means nothing has been recorded yet.
+    """
+    property_id = property_id or get_default_property_id()
+    row = DataVersion.objects.filter(property_id=property_id).values_list('version', 'updated_at').first()
+    return row if row else (0, None)
+
+
+def bump_data_version(property_id=None):
+    """
+    Moves a property's data version forward. Runs inside the caller's
+    transaction, so a rolled back write does not move it.
+    """
+    property_id = property_id or get_default_property_id()
+    updated = DataVersion.objects.filter(property_id=property_id).update(
+        version=F('version') + 1, updated_at=timezone.now()
+    )
+    if not updated:
+        DataVersion.objects.get_or_create(property_id=property_id, defaults={'version': 1})
+
+
+def bulk_set_prices(dates, rate, property_id=None):
+    """
+    Upserts a PricingRule for each date in one INSERT ... ON CONFLICT
+    statement. bulk_create skips model signals, so the data version and
+    the touched months are bumped here.
+    """
+    property_id = property_id or get_default_property_id()
+    rules = [PricingRule(property_id=property_id, date=d, rate=rate) for d in sorted(set(dates))]
+    with transaction.atomic():
+        PricingRule.objects.bulk_create(
+            rules, update_conflicts=True, unique_fields=['property', 'date'], update_fields=['rate']
+        )
+        bump_data_version(property_id)
+
+        from .snapshots import bump_dates  # snapshots imports this module
+        bump_dates(property_id, [rule.date for rule in rules])
+    return [rule.date for rule in rules]
+
+
+def mark_bookings_paid(bookings):
+    """
+    Marks a queryset of bookings paid with one UPDATE, and writes the
+    NightOccupancy rows of the ones that were unpaid with one bulk INSERT,
+    instead of saving them one by one. The data version of each property
+    and the version of each month touched are bumped once. Raises IntegrityError, having changed nothing, when a
+    night is already taken. Returns how many bookings were marked.
+    """
+    with transaction.atomic():
+        unpaid = list(bookings.filter(paid=False).values_list('pk', 'property_id', 'check_in', 'check_out'))
+        if not unpaid:
+            return 0
+        bookings.filter(paid=False).update(paid=True)
+        NightOccupancy.objects.bulk_create([
+            NightOccupancy(property_id=property_id, date=check_in + timedelta(days=i), booking_id=pk)
+            for pk, property_id, check_in, check_out in unpaid for i in range((check_out - check_in).days)
+        ], batch_size=500)
+
+        from .snapshots import bump_month_list, month_starts  # snapshots imports this module
+        months = defaultdict(set)
+        for _, property_id, check_in, check_out in unpaid:
+            months[property_id].update(month_starts(check_in, check_out))
+        for property_id, touched in months.items():
+            bump_data_version(property_id)
+            bump_month_list(property_id, sorted(touched))
+    return len(unpaid)
+
+
+def delete_past_pricing_rules(rules):
+    """
+    Deletes the rules of a queryset dated before today with one DELETE.
+    QuerySet.delete() would load every rule and send a post_delete per
+    row, each bumping the data version; here the data version of each
+    property, and the version of each month touched, are bumped once
+    instead. Returns how many rules were deleted.
+    """
+    from .snapshots import bump_month_list  # snapshots imports this module
+    past = rules.filter(date__lt=date.today()).order_by()
+    connection = connections[past.db]
+    with transaction.atomic(using=past.db):
+        touched = defaultdict(set)
+        for property_id, month in past.annotate(month=TruncMonth('date')).values_list('property_id', 'month').distinct():
+            touched[property_id].add(month)
+
+        sql, params = past.values('pk').query.get_compiler(past.db).as_sql()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {connection.ops.quote_name(PricingRule._meta.db_table)} WHERE id IN ({sql})", params
+            )
+            deleted = cursor.rowcount
+
+        for property_id, months in touched.items():
+            bump_data_version(property_id)
+            bump_month_list(property_id, sorted(months))
+    return deleted
+
+
+def get_price_overrides(start: date, end: date, property_id=None):
+    """
+    Returns a {date: rate} dict of every override in [start, end),
+    loaded with a single range query on (property, date).
+    """
+    return dict(
+        PricingRule.objects.filter(
+            property_id=property_id or get_default_property_id(), date__gte=start, date__lt=end
+        ).values_list('date', 'rate')
+    )
+
+
+def get_nightly_prices(check_in: date, check_out: date, property_id=None):
+    """
+    Returns a list of (date, price) tuples, one per night of the stay,
+    read from the compiled price vector (see booking.pricing), so the
+    number of queries does not depend on the length of the stay.
+    """
+    if check_out <= check_in:
+        return []
+
+    from .pricing import get_price_vector  # pricing imports this module
+    return get_price_vector(check_in, check_out, property_id=property_id).nights(check_in, check_out)
+
+
+def calculate_total_price(check_in, check_out, property_id=None):
+    return sum((price for _, price in get_nightly_prices(check_in, check_out, property_id)), 0)
+
+
+def get_base_rate(property_id=None, data_version=None):
     """
     Returns the default nightly rate from PricingConfig,
     or a fallback value if not set.
     """
-    config = PricingConfig.objects.first()
-    return config.base_rate if config else DEFAULT_BASE_RATE  # fallback value
+    return get_site_config(property_id, data_version).base_rate
 
 
-def get_override_price_for_date(target_date: date):
+def get_override_price_for_date(target_date: date, property_id=None):
     """
     Returns the override price for a specific date if it exists,
     otherwise returns None.
     """
-    rule = PricingRule.objects.filter(date=target_date).first()
+    rule = PricingRule.objects.filter(property_id=property_id or get_default_property_id(), date=target_date).first()
     return rule.rate if rule else None
 
 
-def get_max_bookable_date():
+def get_max_bookable_date(property_id=None, data_version=None):
     """
     Returns the latest date that guests can book, based on config.
     """
-    config = AvailabilityConfig.objects.first()
-    months = config.months_ahead if config else DEFAULT_BOOKING_WINDOW_MONTHS
-    return date.today() + timedelta(days=months * 30)
+    return date.today() + timedelta(days=get_site_config(property_id, data_version).months_ahead * 30)
+
+
+def are_dates_available(check_in: date, check_out: date, property_id=None):
+    """
+    Returns True if no night in [check_in, check_out) is taken by a paid
+    booking or held by a checkout in progress. Two index range lookups, on
+    NightOccupancy (property, date) and BookingHold (property, expires_at).
+    """
+    property_id = property_id or get_default_property_id()
+    return not (
+        NightOccupancy.objects.filter(property_id=property_id, date__gte=check_in, date__lt=check_out).exists()
+        or BookingHold.objects.active().overlapping(property_id, check_in, check_out).exists()
+    )
+
+
+def get_active_holds(property_id=None):
+    """
+    Returns the (check_in, check_out) of every unexpired hold of a
+    property, sorted. Holds only live for the length of a checkout, so
+    there are never many: they are cached together until one is placed or
+    released, and the lapsed ones are dropped on read.
+    """
+    property_id = property_id or get_default_property_id()
+    key = HOLDS_CACHE_KEY.format(property_id)
+    holds = cache.get(key)
+    if holds is None:
+        holds = list(
+            BookingHold.objects.active().filter(property_id=property_id)
+            .order_by('check_in').values_list('check_in', 'check_out', 'expires_at')
+        )
+        cache.set(key, holds, None)
+    now = timezone.now()
+    return [(check_in, check_out) for check_in, check_out, expires_at in holds if expires_at > now]
+
+
+def invalidate_holds(property_id=None):
+    cache.delete(HOLDS_CACHE_KEY.format(property_id or get_default_property_id()))
+
+
+def get_occupancy_map(start: date, end: date, property_id=None):
+    """
+    Returns a {date: (booking_id, guest_name)} dict for every night in
+    [start, end) taken by a paid booking, built from a single range query.
+    """
+    nights = NightOccupancy.objects.filter(
+        property_id=property_id or get_default_property_id(), date__gte=start, date__lt=end
+    ).values_list('date', 'booking_id', 'booking__name')
+    return {night: (booking_id, name) for night, booking_id, name in nights}
+
+
+def iter_free_nights(start: date, end: date, booked_ranges):
+    """
+    Yields every date in [start, end) not covered by any of the
+    (check_in, check_out) pairs in booked_ranges, which must be sorted by
+    check_in. Runs in a single sweep over the days and the ranges.
+    """
+    booked_ranges = list(booked_ranges)
+    booked_until = start
+    i = 0
+    current = start
+    while current < end:
+        while i < len(booked_ranges) and booked_ranges[i][0] <= current:
+            booked_until = max(booked_until, booked_ranges[i][1])
+            i += 1
+        if current < booked_until:
+            current = booked_until  # Jump over the whole booked stretch
+            continue
+        yield current
+        current += timedelta(days=1)
 
 
-def get_nightly_price(target_date: date):
+def get_nightly_price(target_date: date, property_id=None):
     """
-    Returns the nightly price for a given date,
-    using override if it exists, otherwise base rate.
+    Returns the nightly price for a given date, after every rule
+    (overrides, weekday rules, seasons, base rate) has been applied.
     """
-    override = get_override_price_for_date(target_date)
-    return override if override is not None else get_base_rate()
\ No newline at end of file
+    from .pricing import get_price_vector
+    return get_price_vector(target_date, target_date + timedelta(days=1), property_id=property_id).price(target_date)
@@ -1,27 +1,40 @@
-from .decorators import owner_required
-from .forms import BookingForm, RegisterForm, AvailabilityConfigForm
-from .models import Booking, PricingRule, PricingConfig, OwnerProfile, AvailabilityConfig
-from .utils import calculate_total_price, get_base_rate, get_override_price_for_date, get_nightly_price
+from .checkout import CheckoutUnavailable, acreate_checkout_session
+from .decorators import owner_required, with_property
+from .forms import BookingForm, QuoteForm, RegisterForm, AvailabilityConfigForm
+from .holds import place_hold, release_hold
+from .outbox import queue_booking_confirmation
+from .quotes import quote_stay, read_quote_token, to_cents
+from .snapshots import KIND_OWNER, KIND_PUBLIC, get_month_snapshots
+from .models import Booking, PricingRule, PricingConfig, OwnerProfile, AvailabilityConfig, ProcessedStripeEvent, get_default_property_id
+from .utils import (
+    bulk_set_prices, calculate_total_price, get_active_holds,
+    get_data_version, get_max_bookable_date, get_site_config, invalidate_site_config, property_reverse,
+)
+from asgiref.sync import sync_to_async
 from calendar import monthrange
 from datetime import date, timedelta, datetime 
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout, get_user_model
 from django.contrib.auth.decorators import login_required
-from django.core.mail import send_mail
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import transaction, IntegrityError
 from django.db.models import Q
-from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
+from django.utils import timezone
 from django.utils.timezone import now
+from django.views.decorators.cache import cache_control
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import condition, require_POST
 from django import forms
+import hashlib
 import json
 import logging
 from smtplib import SMTPException
 import stripe
+import time
 
 
 User = get_user_model()
@@ -31,72 +44,109 @@ stripe.api_key = settings.STRIPE_SECRET_KEY
 nightly_rate = settings.NIGHTLY_RATE
 logger = logging.getLogger(__name__)
 
+MAX_CALENDAR_RANGE_DAYS = 366  # Upper bound on the days a single calendar request can span
+MAX_NIGHTLY_PRICE = Decimal('10000')  # PricingRule.rate holds up to 9999.99
+CHECKOUT_RETRY_AFTER_SECONDS = 5  # Retry-After sent with the "try again" page when Stripe is slow
+STREAM_CHUNK_EVENTS = 64  # Events serialized per chunk of a streamed calendar feed
+DASHBOARD_PAGE_SIZE = 50  # Bookings per page of the owner dashboard and per "load more"
+DASHBOARD_COLUMNS = ('id', 'name', 'check_in', 'check_out', 'paid')  # All the dashboard shows
+
 
 class HttpResponseSeeOther(HttpResponseRedirect):
     status_code = 303
 
 
-def book_view(request):
-    if request.method == 'POST':
-        form = BookingForm(request.POST)
-        if form.is_valid(): 
-            name = form.cleaned_data['name']
-            email = form.cleaned_data['email']
-            check_in = form.cleaned_data['check_in']
-            check_out = form.cleaned_data['check_out']
-
-            # Check for past dates
-            if check_in < date.today():
-                return render(request, 'booking/book.html', {
-                    'form': form,
-                    'error': 'Check-in date cannot be in the past.',
-                })
-
-            # Check for overlapping paid bookings only
-            overlapping = Booking.objects.filter(
-                Q(check_in__lt=check_out) & Q(check_out__gt=check_in),
-                paid=True
-            )
-            if overlapping.exists():
-                return render(request, 'booking/book.html', {
-                    'form': form,
-                    'error': 'These dates are already booked.',
-                })
-
-            total_amount = int(float(calculate_total_price(check_in, check_out)) * 100) # Stripe expects cents as integers
-
-            # Create Stripe Checkout Session
-            session = stripe.checkout.Session.create(
-                payment_method_types=['card'],
-                line_items=[{
-                    'price_data': {
-                        'currency': 'eur',
-                        'product_data': {
-                            'name': f'Booking for {name}',
-                        },
-                        'unit_amount': total_amount,
-                    },
-                    'quantity': 1,
-                }],
-                mode='payment',
-                success_url=settings.DOMAIN + '/success/',
-                cancel_url=settings.DOMAIN + '/cancel/',
-                metadata={
-                    'name': name,
-                    'email': email,
-                    'check_in': check_in.isoformat(),
-                    'check_out': check_out.isoformat(),
-                    'total_price': total_amount / 100,
-                }
-            )
-            return HttpResponseSeeOther(session.url)
-        else:
-            # Form is invalid: redisplay with errors
-            return render(request, 'booking/book.html', {'form': form})
-    else:
-        form = BookingForm()
+def _validate_booking(request):
+    """
+    Sync half of the booking submit path: validates the form, checks the
+    dates and prices the stay. Returns either a response to send back as
+    is, or the keyword arguments for the Stripe checkout session.
+    """
+    property_id = request.property.pk
+    form = BookingForm(request.POST, property_id=property_id)
+    if not form.is_valid():
+        # Form is invalid: redisplay with errors
+        return render(request, 'booking/book.html', {'form': form})
+
+    name = form.cleaned_data['name']
+    email = form.cleaned_data['email']
+    check_in = form.cleaned_data['check_in']
+    check_out = form.cleaned_data['check_out']
+
+    # Check for past dates
+    if check_in < date.today():
+        return render(request, 'booking/book.html', {
+            'form': form,
+            'error': 'Check-in date cannot be in the past.',
+        })
+
+    # A fresh quote token (see booking.quotes) already carries the total
+    total_amount = read_quote_token(request.POST.get('quote'), property_id, check_in, check_out)
+    if total_amount is None:
+        total_amount = to_cents(calculate_total_price(check_in, check_out, property_id))
+
+    # Hold the nights for the length of the checkout; no hold means a paid
+    # booking or another guest's checkout has some of them
+    hold = place_hold(property_id, check_in, check_out)
+    if hold is None:
+        return render(request, 'booking/book.html', {
+            'form': form,
+            'error': 'These dates are already booked.',
+        })
+
+    return {
+        'property_id': property_id,
+        'name': name,
+        'email': email,
+        'check_in': check_in,
+        'check_out': check_out,
+        'total_amount': total_amount,
+        'hold_id': hold.pk,
+        'expires_at': hold.expires_at,
+    }
 
-    return render(request, 'booking/book.html', {'form': form})
+
+@with_property
+async def book_view(request):
+    if request.method != 'POST':
+        return await sync_to_async(render)(request, 'booking/book.html', {'form': BookingForm()})
+
+    checkout = await sync_to_async(_validate_booking)(request)
+    if isinstance(checkout, HttpResponse):
+        return checkout
+
+    # Stripe I/O runs off the event loop, with timeouts and a concurrency cap
+    try:
+        session = await acreate_checkout_session(**checkout)
+    except CheckoutUnavailable:
+        # Without a session nobody can pay for the held nights
+        await sync_to_async(release_hold)(checkout['hold_id'])
+        response = await sync_to_async(render)(request, 'booking/retry.html', {
+            'form': BookingForm(request.POST),
+            'quote': request.POST.get('quote', ''),
+        }, status=503)
+        response['Retry-After'] = str(CHECKOUT_RETRY_AFTER_SECONDS)
+        return response
+    except Exception:
+        await sync_to_async(release_hold)(checkout['hold_id'])
+        raise
+
+    return HttpResponseSeeOther(session.url)
+
+@with_property
+def quote_view(request):
+    """
+    Availability, per-night prices and total of ?check_in=...&check_out=...
+    as JSON, plus a quote token to submit with the booking form when the
+    dates are free. See booking.quotes.
+    """
+    data_version = get_data_version(request.property.pk)
+    form = QuoteForm(request.GET, property_id=request.property.pk, data_version=data_version)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors.get_json_data()}, status=400)
+    return JsonResponse(quote_stay(
+        request.property.pk, form.cleaned_data['check_in'], form.cleaned_data['check_out'], data_version
+    ))
 
 def payment_success(request):
     return render(request, 'booking/success.html')
@@ -104,6 +154,32 @@ def payment_success(request):
 def payment_cancel(request):
     return render(request, 'booking/cancel.html')
 
+def record_stripe_event(event, outcome, started):
+    """
+    Writes (or rewrites, after an earlier error) the ledger entry for a
+    webhook event, with how long it took to handle.
+    """
+    event_id = event.get('id')
+    if not event_id:
+        return
+    ProcessedStripeEvent.objects.update_or_create(
+        event_id=event_id,
+        defaults={
+            'event_type': event.get('type', ''),
+            'outcome': outcome,
+            'duration_ms': int((time.perf_counter() - started) * 1000),
+        }
+    )
+
+
+def is_duplicate_stripe_event(event):
+    # Events that failed with an error are processed again on retry
+    event_id = event.get('id')
+    return bool(event_id) and ProcessedStripeEvent.objects.filter(
+        event_id=event_id
+    ).exclude(outcome=ProcessedStripeEvent.OUTCOME_ERROR).exists()
+
+
 @csrf_exempt
 def stripe_webhook(request):
     payload = request.body
@@ -117,23 +193,29 @@ def stripe_webhook(request):
     except (ValueError, stripe.error.SignatureVerificationError):
         return HttpResponse(status=400)
 
+    # Stripe retries deliveries: acknowledge repeats with one indexed lookup
+    if is_duplicate_stripe_event(event):
+        return JsonResponse({'status': 'duplicate'})
+
+    started = time.perf_counter()
+
     if event['type'] == 'checkout.session.completed':
         session = event['data']['object']
         metadata = session['metadata']
 
         try:
+            check_in = date.fromisoformat(metadata['check_in'])
+            check_out = date.fromisoformat(metadata['check_out'])
+
+            # Booking.save writes the NightOccupancy rows in the same
+            # transaction; the unique index on the night rejects overlaps.
+            # The confirmation email is queued alongside and sent by
+            # `manage.py send_outbox`, so SMTP never slows the webhook down.
+            # The ledger entry commits with them, so a concurrent duplicate
+            # delivery fails on the event id instead of booking twice.
             with transaction.atomic():
-                check_in = date.fromisoformat(metadata['check_in'])
-                check_out = date.fromisoformat(metadata['check_out'])
-
-                overlapping = Booking.objects.select_for_update().filter(
-                    Q(check_in__lt=check_out) & Q(check_out__gt=check_in),
-                    paid=True
-                )
-                if overlapping.exists():
-                    return JsonResponse({'error': 'Dates already booked'}, status=409)
-
                 booking = Booking.objects.create(
+                    property_id=metadata.get('property_id') or get_default_property_id(),
                     name=metadata['name'],
                     email=metadata['email'],
                     check_in=check_in,
@@ -141,72 +223,211 @@ def stripe_webhook(request):
                     total_price=metadata.get('total_price', 0),
                     paid=True
                 )
-
+                queue_booking_confirmation(booking)
+                release_hold(metadata.get('hold_id'))
+                record_stripe_event(event, ProcessedStripeEvent.OUTCOME_PROCESSED, started)
+
+        except IntegrityError:
+            if is_duplicate_stripe_event(event):
+                return JsonResponse({'status': 'duplicate'})
+            record_stripe_event(event, ProcessedStripeEvent.OUTCOME_CONFLICT, started)
+            return JsonResponse({'error': 'Dates already booked'}, status=409)
         except Exception as e:
             logger.error(f"Webhook booking creation failed: {e}")
+            record_stripe_event(event, ProcessedStripeEvent.OUTCOME_ERROR, started)
             return JsonResponse({'error': 'Booking creation failed'}, status=500)
 
-        try:
-            send_mail(
-                subject='Booking Confirmation - Navona Romantica',
-                message=f"Hi {booking.name},\n\nThanks for your booking from {booking.check_in} to {booking.check_out}.\nWe look forward to welcoming you!",
-                from_email=None,
-                recipient_list=[booking.email],
-                fail_silently=False,
-            )
-        except Exception as e:
-            logger.error(f"Booking created but email sending failed: {e}")
-
         return JsonResponse({'status': 'success'})
 
+    if event['type'] == 'checkout.session.expired':
+        # The guest abandoned the checkout: free the nights right away
+        release_hold(event['data']['object'].get('metadata', {}).get('hold_id'))
+        record_stripe_event(event, ProcessedStripeEvent.OUTCOME_PROCESSED, started)
+        return JsonResponse({'status': 'released'})
+
+    record_stripe_event(event, ProcessedStripeEvent.OUTCOME_IGNORED, started)
     return HttpResponse(status=200)
 
 
 
 # HTML view
+@with_property
 def availability_view(request):
     return render(request, "booking/availability.html")
 
+def parse_calendar_range(request, default_start, default_end):
+    """
+    Reads FullCalendar's `start`/`end` query params (ISO dates, optionally
+    with a time part) and returns them as a [start, end) pair of dates.
+    Missing or malformed values fall back to the defaults.
+    """
+    def parse(value, default):
+        try:
+            return date.fromisoformat(value[:10])
+        except (TypeError, ValueError):
+            return default
+
+    start = parse(request.GET.get('start'), default_start)
+    end = parse(request.GET.get('end'), default_end)
+    return start, max(start, end)
+
+
+def _request_data_version(request):
+    # etag_func and last_modified_func both need it; read it once per request
+    if not hasattr(request, '_data_version'):
+        request._data_version = get_data_version(request.property.pk)
+    return request._data_version
+
+
+def _request_holds(request):
+    # Read once per request too: the feeds and both validators need them
+    if not hasattr(request, '_holds'):
+        request._holds = get_active_holds(request.property.pk)
+    return request._holds
+
+
+def calendar_etag(request, *args, **kwargs):
+    """
+    Strong ETag for the calendar feeds: data version + active holds +
+    requested URL + today's date (the public window starts today).
+    """
+    version, _ = _request_data_version(request)
+    key = f"{version}|{_request_holds(request)}|{request.get_full_path()}|{date.today().isoformat()}"
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def calendar_last_modified(request, *args, **kwargs):
+    # Holds come and go (and lapse) without a timestamp to compare, so
+    # while there are any, only the ETag validates
+    if _request_holds(request):
+        return None
+    # Feeds also change at midnight, when the window moves
+    _, updated_at = _request_data_version(request)
+    midnight = timezone.make_aware(datetime.combine(date.today(), datetime.min.time()))
+    return max(updated_at, midnight) if updated_at else midnight
+
+
+def stream_json_array(items):
+    """
+    Serializes an iterable as a JSON array, STREAM_CHUNK_EVENTS items per
+    chunk, so neither the items nor the encoded array are ever held whole.
+    """
+    encoder = DjangoJSONEncoder()
+    separator = '['
+    chunk = []
+    for item in items:
+        chunk.append(encoder.encode(item))
+        if len(chunk) == STREAM_CHUNK_EVENTS:
+            yield separator + ','.join(chunk)
+            separator, chunk = ',', []
+    if chunk:
+        yield separator + ','.join(chunk)
+        separator = ','
+    yield ']' if separator == ',' else '[]'
+
+
+def calendar_response(request, events):
+    """
+    Sends a feed's events as a JSON array: streamed from the generator
+    with ?stream=1, so memory and time to first byte do not grow with the
+    window, or built in one piece otherwise.
+    """
+    if request.GET.get('stream') == '1':
+        return StreamingHttpResponse(stream_json_array(events), content_type='application/json')
+    return JsonResponse(list(events), safe=False)
+
+
+def price_runs(start, end, free_nights):
+    """
+    Run-length encodes the nightly prices of [start, end) as
+    [[days, price], ...]; the price is None for nights that are not free.
+    free_nights are sorted (night, price) pairs.
+    """
+    runs = []
+
+    def add(days, price):
+        if runs and runs[-1][1] == price:
+            runs[-1][0] += days
+        else:
+            runs.append([days, price])
+
+    current = start
+    for night, price in free_nights:
+        if night > current:
+            add((night - current).days, None)
+        add(1, price)
+        current = night + timedelta(days=1)
+    if current < end:
+        add((end - current).days, None)
+    return runs
+
+
+@with_property
+@cache_control(public=True, no_cache=True)
+@condition(etag_func=calendar_etag, last_modified_func=calendar_last_modified)
 def availability_json(request):
+    """
+    Paid stays and the price of every free night, as FullCalendar events,
+    assembled from the cached month snapshots (see booking.snapshots).
+    With ?format=compact the free nights are sent run-length encoded
+    instead (see price_runs); the availability page expands them. With
+    ?stream=1 the events are streamed (see calendar_response).
+    """
     today = date.today()
-
-    # Get availability window
-    availability_config = AvailabilityConfig.objects.first()
-    months_ahead = availability_config.months_ahead if availability_config else 3
-    max_date = today + timedelta(days=months_ahead * 30)
-
-    # Bookings
-    bookings = Booking.objects.all()
-    events = []
-
-    for booking in bookings:
-        events.append({
-            "title": "Booked",
-            "start": booking.check_in.isoformat(),
-            "end": booking.check_out.isoformat(),
-            "color": "red"
+    property_id = request.property.pk
+
+    # Visible range, clipped to the availability window for free nights
+    max_date = get_max_bookable_date(property_id, _request_data_version(request))
+    range_start, range_end = parse_calendar_range(request, today, max_date + timedelta(days=1))
+    # Months are materialized one by one, so the range is kept within a
+    # year on either side of the window
+    range_start = max(range_start, today - timedelta(days=MAX_CALENDAR_RANGE_DAYS))
+    range_end = min(range_end, max_date + timedelta(days=1 + MAX_CALENDAR_RANGE_DAYS))
+    window_start = max(range_start, today)
+    window_end = min(range_end, max_date + timedelta(days=1))
+
+    months = get_month_snapshots(KIND_PUBLIC, property_id, range_start, range_end, _request_data_version(request))
+
+    # Paid stays overlapping the visible range; one crossing a month end
+    # is in both months' snapshots. Held stays are shown as booked too.
+    holds = [stay for stay in _request_holds(request) if stay[0] < range_end and stay[1] > range_start]
+    booked_ranges = sorted(dict.fromkeys(
+        [stay for month in months for stay in month['booked'] if stay[0] < range_end and stay[1] > range_start]
+        + holds
+    ))
+    held_nights = {check_in + timedelta(days=i) for check_in, check_out in holds for i in range((check_out - check_in).days)}
+    free_nights = [
+        (night, price) for month in months for night, price in month['free']
+        if window_start <= night < window_end and night not in held_nights
+    ]
+
+    if request.GET.get('format') == 'compact':
+        return JsonResponse({
+            'start': window_start.isoformat(),
+            'runs': price_runs(window_start, window_end, free_nights) if window_start < window_end else [],
+            'booked': [[check_in.isoformat(), check_out.isoformat()] for check_in, check_out in booked_ranges],
         })
 
-    # Pricing rules
-    pricing_rules = PricingRule.objects.filter(date__range=(today, max_date))
-    pricing_dict = {pr.date: pr.rate for pr in pricing_rules}
-    base_rate = get_base_rate()
-
-    # Add price for each available day
-    current = today
-    while current <= max_date:
-        if not any(b.check_in <= current < b.check_out for b in bookings):  # Skip if already booked
-            price = pricing_dict.get(current, base_rate)
-            events.append({
+    def events():
+        for check_in, check_out in booked_ranges:
+            yield {
+                "title": "Booked",
+                "start": check_in.isoformat(),
+                "end": check_out.isoformat(),
+                "color": "red"
+            }
+
+        # Add price for each available day
+        for night, price in free_nights:
+            yield {
                 "title": f"€{price}",
-                "start": current.isoformat(),
+                "start": night.isoformat(),
                 "allDay": True,
                 "color": "#d1e7dd",
                 "textColor": "#0f5132"
-            })
-        current += timedelta(days=1)
+            }
 
-    return JsonResponse(events, safe=False)
+    return calendar_response(request, events())
 
 
 def register_view(request):
@@ -252,55 +473,128 @@ def logout_view(request):
     return redirect("login")
 
 
+def parse_dashboard_filters(request):
+    """
+    Reads the dashboard's `paid` ('1' or '0'), `month` ('YYYY-MM') and
+    `after` (cursor) query params. Missing or malformed values are None.
+    """
+    paid = {'1': True, '0': False}.get(request.GET.get('paid'))
+    try:
+        month = datetime.strptime(request.GET.get('month', ''), '%Y-%m').date()
+    except ValueError:
+        month = None
+    try:
+        check_in, pk = request.GET.get('after', '').split('.')
+        after = (date.fromisoformat(check_in), int(pk))
+    except ValueError:
+        after = None
+    return paid, month, after
+
+
+def dashboard_page(property_id, paid=None, month=None, after=None):
+    """
+    One page of the owner dashboard, ordered by (check_in, id): stays
+    checking in during `month`, or upcoming ones without it. Paginated by
+    keyset, starting after the (check_in, id) cursor, so every page costs
+    one indexed LIMIT query no matter how much history there is. Returns
+    the bookings and the cursor of the next page (None on the last one).
+    """
+    bookings = Booking.objects.filter(property_id=property_id).only(*DASHBOARD_COLUMNS).order_by('check_in', 'id')
+    if month:
+        bookings = bookings.filter(check_in__gte=month, check_in__lt=(month + timedelta(days=32)).replace(day=1))
+    else:
+        bookings = bookings.filter(check_out__gte=now().date())
+    if paid is not None:
+        bookings = bookings.filter(paid=paid)
+    if after:
+        bookings = bookings.filter(Q(check_in__gt=after[0]) | Q(check_in=after[0], id__gt=after[1]))
+
+    page = list(bookings[:DASHBOARD_PAGE_SIZE + 1])
+    if len(page) <= DASHBOARD_PAGE_SIZE:
+        return page, None
+    last = page[DASHBOARD_PAGE_SIZE - 1]
+    return page[:DASHBOARD_PAGE_SIZE], f"{last.check_in.isoformat()}.{last.pk}"
+
+
+@with_property
 @owner_required
 def owner_dashboard(request):
-    today = now().date()
-    upcoming_bookings = Booking.objects.filter(check_out__gte=today).order_by('check_in')
-    base_price_obj = PricingConfig.objects.first()
-    base_rate = base_price_obj.base_rate if base_price_obj else None
+    """
+    The owner's bookings, a page at a time (see dashboard_page). With
+    ?format=json the page is sent as JSON for the "load more" button.
+    """
+    paid, month, after = parse_dashboard_filters(request)
+    bookings, next_cursor = dashboard_page(request.property.pk, paid, month, after)
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'bookings': [
+                {
+                    'id': booking.pk,
+                    'name': booking.name,
+                    'check_in': booking.check_in.isoformat(),
+                    'check_out': booking.check_out.isoformat(),
+                    'paid': booking.paid,
+                }
+                for booking in bookings
+            ],
+            'next': next_cursor,
+        })
 
     context = {
-        'bookings': upcoming_bookings,
-        'base_rate': base_rate,
+        'bookings': bookings,
+        'next_cursor': next_cursor,
+        'paid': request.GET.get('paid', ''),
+        'month': month.strftime('%Y-%m') if month else '',
+        'base_rate': get_site_config(request.property.pk).configured_base_rate,
     }
     return render(request, 'owner/dashboard.html', context)
 
 
 @require_POST
+@with_property
 @owner_required
 def update_base_rate(request):
     new_rate = request.POST.get('base_rate')
     try:
         rate_decimal = Decimal(new_rate)
-        config, _ = PricingConfig.objects.get_or_create(pk=1)
+        config, _ = PricingConfig.objects.get_or_create(property=request.property)
         config.base_rate = rate_decimal
         config.save()
+        invalidate_site_config(request.property.pk)
     except (InvalidOperation, TypeError):
         pass  # Optional: add error feedback
 
-    return redirect('owner_dashboard')
+    return redirect(property_reverse(request, 'owner_dashboard'))
 
 
+@with_property
 @owner_required
 def owner_calendar(request):
-    return render(request, 'owner/calendar.html')
+    return render(request, 'owner/calendar.html', {
+        'weekdays': list(enumerate(['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'])),
+    })
 
 
+@with_property
 @owner_required
 def manage_booking_window(request):
-    config = AvailabilityConfig.objects.first()
+    config = AvailabilityConfig.objects.filter(property=request.property).first()
 
     if request.method == 'POST':
         form = AvailabilityConfigForm(request.POST, instance=config)
         if form.is_valid():
-            form.save()
+            config = form.save(commit=False)
+            config.property = request.property
+            config.save()
+            invalidate_site_config(request.property.pk)
 
             # If it's an AJAX request, return JSON instead of redirecting
             if request.headers.get('x-requested-with') == 'XMLHttpRequest':
                 return JsonResponse({"success": True, "message": "Booking window updated successfully."})
 
             messages.success(request, "Booking window updated successfully.")
-            return redirect('manage_booking_window')
+            return redirect(property_reverse(request, 'manage_booking_window'))
         else:
             if request.headers.get('x-requested-with') == 'XMLHttpRequest':
                 return JsonResponse({
@@ -316,35 +610,42 @@ def manage_booking_window(request):
 
 
 
+@with_property
+@cache_control(private=True, no_cache=True)
+@owner_required
+@condition(etag_func=calendar_etag, last_modified_func=calendar_last_modified)
 def owner_calendar_data(request):
-    # Show current + next month (adjust as needed)
-    today = date.today()
-    start_date = today.replace(day=1)
-    end_date = (start_date + timedelta(days=62))
-
-    events = []
-
-    d = start_date
-    while d <= end_date:
-        price = get_nightly_price(d)
-        is_booked = Booking.objects.filter(check_in__lte=d, check_out__gt=d, paid=True).exists()
-        events.append({
-            'title': f"€{price}" if price else '',
-            'start': d.isoformat(),
-            'allDay': True,
-            'extendedProps': {
-                'price': price,
-                'booked': is_booked,
-            },
-            'color': '#f0f0f0' if not is_booked else '#f8d7da',
-            'textColor': '#000'
-        })
-        d += timedelta(days=1)
+    # Defaults to the current + next month when FullCalendar sends no range
+    start_of_month = date.today().replace(day=1)
+    start_date, end_date = parse_calendar_range(request, start_of_month, start_of_month + timedelta(days=63))
+    end_date = min(end_date, start_date + timedelta(days=MAX_CALENDAR_RANGE_DAYS))
+
+    # Whole months come from the snapshots (see booking.snapshots)
+    months = get_month_snapshots(
+        KIND_OWNER, request.property.pk, start_date, end_date, _request_data_version(request)
+    )
+    first, last = start_date.isoformat(), end_date.isoformat()
+    held_nights = {
+        (check_in + timedelta(days=i)).isoformat()
+        for check_in, check_out in _request_holds(request) for i in range((check_out - check_in).days)
+    }
 
-    return JsonResponse(events, safe=False)
+    def events():
+        for month in months:
+            for event in month:
+                if not first <= event['start'] < last:
+                    continue
+                if event['start'] in held_nights and not event['extendedProps']['booked']:
+                    # A guest is paying for the night right now
+                    event = {**event, 'extendedProps': {**event['extendedProps'], 'held': True}, 'color': '#fff3cd'}
+                yield event
+
+    return calendar_response(request, events())
 
 
 @csrf_exempt
+@with_property
+@owner_required
 def update_price(request):
     if request.method == 'POST':
         try:
@@ -356,6 +657,7 @@ def update_price(request):
                 return JsonResponse({'success': False, 'error': 'Price must be zero or greater.'}, status=400)
 
             rule, created = PricingRule.objects.update_or_create(
+                property=request.property,
                 date=date_obj,
                 defaults={'rate': price}
             )
@@ -364,4 +666,64 @@ def update_price(request):
             return JsonResponse({'success': False, 'error': 'Invalid data format. Please enter a valid price and date.'}, status=400)
         except Exception as e:
             return JsonResponse({'success': False, 'error': 'Server error. Please try again later.'}, status=500)
-    return JsonResponse({'success': False, 'error': 'Invalid method'}, status=405)
\ No newline at end of file
+    return JsonResponse({'success': False, 'error': 'Invalid method'}, status=405)
+
+
+class TooManyDays(ValueError):
+    """A bulk price request covers more than MAX_CALENDAR_RANGE_DAYS days."""
+
+
+def expand_price_dates(data):
+    """
+    Turns a bulk price request into the list of dates it covers. Accepts
+    either `dates` (a list of ISO dates) or a `start`/`end` range (end
+    exclusive, like FullCalendar selections), optionally narrowed by
+    `weekdays` (0 = Monday ... 6 = Sunday). Raises TooManyDays before
+    building the list when the request spans more than
+    MAX_CALENDAR_RANGE_DAYS days.
+    """
+    if 'dates' in data:
+        if len(data['dates']) > MAX_CALENDAR_RANGE_DAYS:
+            raise TooManyDays()
+        dates = [date.fromisoformat(value) for value in data['dates']]
+    else:
+        start = date.fromisoformat(data['start'])
+        end = date.fromisoformat(data['end'])
+        if end <= start:
+            raise ValueError('End must be after start.')
+        if (end - start).days > MAX_CALENDAR_RANGE_DAYS:
+            raise TooManyDays()
+        dates = [start + timedelta(days=i) for i in range((end - start).days)]
+
+    weekdays = data.get('weekdays')
+    if weekdays is not None:
+        weekdays = {int(day) for day in weekdays}
+        dates = [d for d in dates if d.weekday() in weekdays]
+    return dates
+
+
+@require_POST
+@with_property
+@owner_required
+def update_prices(request):
+    """Sets one price on many days at once; see expand_price_dates for the payload."""
+    try:
+        data = json.loads(request.body)
+        dates = expand_price_dates(data)
+        price = Decimal(str(data['price']))
+    except TooManyDays:
+        return JsonResponse({'success': False, 'error': f'At most {MAX_CALENDAR_RANGE_DAYS} days can be updated at once.'}, status=400)
+    except (KeyError, TypeError, ValueError, InvalidOperation):
+        return JsonResponse({'success': False, 'error': 'Invalid data format. Please enter a valid price and dates.'}, status=400)
+
+    if not price.is_finite() or price < 0 or price >= MAX_NIGHTLY_PRICE:
+        return JsonResponse({'success': False, 'error': f'Price must be between 0 and {MAX_NIGHTLY_PRICE}.'}, status=400)
+    if not dates:
+        return JsonResponse({'success': False, 'error': 'No days match the selection.'}, status=400)
+
+    updated = bulk_set_prices(dates, price, request.property.pk)
+    return JsonResponse({
+        'success': True,
+        'updated': len(updated),
+        'days': [{'date': d.isoformat(), 'price': price} for d in updated],
+    })
@@ -12,5 +12,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+os.environ.setdefault('SERVER_INTERFACE', 'asgi')  # No persistent DB connections (see SQLITE_PRODUCTION_PROFILE)
 
 application = get_asgi_application()
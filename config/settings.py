@@ -29,6 +29,11 @@ SECRET_KEY = 'django-insecure-4h)sx&njch##k#f=tnl2z31s+1zj+vmhl0f)+ztd=wdq3o-@!b
 STRIPE_SECRET_KEY = os.getenv('STRIPE_SECRET_KEY', 'sk_test_51RCUZNRxzYnEVIWRvcNLzwofis50jGpWr18F9c7x9mE2zP8OgeVTBSRCNS6tPIUCkMZuNZlnDx868ecOkWGvxZNi00GlVn0lDh')
 STRIPE_PUBLISHABLE_KEY = os.getenv('STRIPE_PUBLISHABLE_KEY', 'pk_test_51RCUZNRxzYnEVIWR1rRgmT12UZufxajbCLrClzmFR3xwojN5S1vzfx4Q20IpSQr51eo3APISfCp3ijDCTIP5R3Gv00U7ghPfVt')
 STRIPE_WEBHOOK_SECRET = 'whsec_97a2a1174f44c64970fcce704da156b5fe795f3b725ce740707cb26b08d9680a'  # Replace with your real secret
+STRIPE_API_BASE = os.getenv('STRIPE_API_BASE', 'https://api.stripe.com')  # point at `manage.py fake_stripe` for local load tests
+STRIPE_CONNECT_TIMEOUT = 3.0  # seconds
+STRIPE_READ_TIMEOUT = 10.0  # seconds
+STRIPE_MAX_CONCURRENCY = 20  # checkout creations in flight per process before guests get the retry page
+BOOKING_HOLD_MINUTES = 31  # nights held per checkout; Stripe sessions must live 30+ minutes, the extra one covers creating it
 DOMAIN = 'http://127.0.0.1:8000'  # or your actual domain
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 DEFAULT_FROM_EMAIL = 'booking@navonaromantica.com'  # Change as needed
@@ -53,6 +58,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'booking.instrumentation.ServerTimingMiddleware',  # outermost, so session/auth queries are counted
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -64,6 +70,10 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'config.urls'
 
+# Requests above either threshold are logged at WARNING by ServerTimingMiddleware
+SERVER_TIMING_QUERY_THRESHOLD = 25
+SERVER_TIMING_SLOW_MS = 500
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -93,6 +103,47 @@ DATABASES = {
     }
 }
 
+# Production SQLite profile, for several workers sharing one database file:
+# - WAL lets calendar reads run while a booking is being written
+# - synchronous=NORMAL is durable in WAL mode and fsyncs far less
+# - IMMEDIATE takes the write lock at BEGIN, so concurrent writers wait on
+#   the busy timeout instead of failing with "database is locked" mid-way
+# - CONN_MAX_AGE keeps connections open across requests under WSGI. Under
+#   ASGI (config/asgi.py sets SERVER_INTERFACE=asgi) it stays 0, as Django
+#   advises: sync code runs on a fresh thread per request there, and each
+#   thread would keep its own connection open
+# Selected with DB_PROFILE=production (the default when DEBUG is off).
+# `manage.py bench_contention` compares it with the plain settings.
+SQLITE_PRODUCTION_PROFILE = {
+    'OPTIONS': {
+        'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;',
+        'timeout': 20,  # busy timeout, in seconds
+        'transaction_mode': 'IMMEDIATE',
+    },
+    'CONN_MAX_AGE': 0 if os.getenv('SERVER_INTERFACE') == 'asgi' else 600,
+    'CONN_HEALTH_CHECKS': True,
+}
+
+if os.getenv('DB_PROFILE', 'development' if DEBUG else 'production') == 'production':
+    DATABASES['default'].update(SQLITE_PRODUCTION_PROFILE)
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Config singletons and other hot lookups are cached here and invalidated by
+# signals. LocMemCache is per process: when running several workers, point
+# this at a shared backend (Redis/Memcached) so invalidations reach all of them.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'navona-booking',
+        # Two calendar snapshots per month of every property's booking window
+        # (booking/snapshots.py), well above the default of 300
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -159,5 +210,10 @@ LOGGING = {
             'level': 'ERROR',
             'propagate': False,
         },
+        'booking.timing': {  # One JSON line per request; only threshold breaches while DEBUG
+            'handlers': ['console'],
+            'level': 'WARNING' if DEBUG else 'INFO',
+            'propagate': False,
+        },
     },
 }
\ No newline at end of file